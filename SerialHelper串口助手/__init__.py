@@ -20,6 +20,35 @@ from bpy.types import Context
 import re
 import queue
 import random
+import array
+import collections
+import itertools
+import codecs
+import struct
+import binascii
+import sys
+import selectors
+import socket
+import asyncio
+import os
+import mmap
+import ast
+import urllib.parse
+import csv
+import ctypes
+import ctypes.util
+import zlib
+import bisect
+import tempfile
+# 录制原始数据时可选的压缩库, 没有安装时使用 zlib
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
 
 
 bl_info = {
@@ -33,20 +62,250 @@ bl_info = {
     "category": "Generic"
 }
 
+class SerialUdpTransport:
+    # udp://本机地址:端口[?remote=对方地址:端口], 对外提供与 serial.Serial 相同的读写接口
+    # 收到的数据报依次拼接成字节流; 没有设置 remote 时回复给最近一次发来数据的地址
+    datagram = True
+
+    def __init__(self, url):
+        parsed = urllib.parse.urlsplit(url)
+        options = urllib.parse.parse_qs(parsed.query)
+        self.remote = None
+        if "remote" in options:
+            host, _, port = options["remote"][0].rpartition(":")
+            self.remote = (host, int(port))
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((parsed.hostname or "0.0.0.0", parsed.port or 0))
+        self.socket.setblocking(False)
+        self.buffer = bytearray()
+        self.peer = None
+        self.is_open = True
+
+    def receive(self):
+        # 取出已经到达的全部数据报
+        while True:
+            try:
+                data, self.peer = self.socket.recvfrom(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            self.buffer += data
+
+    @property
+    def in_waiting(self):
+        self.receive()
+        return len(self.buffer)
+
+    def read(self, size=1):
+        self.receive()
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def write(self, data):
+        address = self.remote or self.peer
+        if address is None:
+            return 0  # 还不知道对方地址, 丢弃
+        self.socket.sendto(data, address)
+        return len(data)
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def close(self):
+        self.is_open = False
+        self.socket.close()
+
+
+class SimulatedSerialDevice(threading.Thread):
+    # sim://?rate=1000&channels=x,y,z&format=text|binary
+    # 在 pty 的一端按固定频率发送 name=value 行或二进制帧, 连接打开 pty 的另一端, 用于没有硬件时的压力测试
+    # 数值是各通道相位不同的正弦波, 每次运行生成的数据相同; 发给设备的数据被读出丢弃, 只统计字节数
+    def __init__(self, url):
+        threading.Thread.__init__(self, daemon=True)
+        import pty
+        import tty
+        options = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+        self.rate = float(options.get("rate", ["1000"])[0])
+        self.channels = options.get("channels", ["x,y,z"])[0].split(",")
+        self.binary = options.get("format", ["text"])[0] == "binary"
+        self.master, slave = pty.openpty()
+        tty.setraw(slave)
+        self.device_name = os.ttyname(slave)
+        self.slave = slave  # 连接打开设备后再关闭, 避免对端关闭时 pty 被回收
+        os.set_blocking(self.master, False)
+        self.stop_event = threading.Event()
+        self.sent_samples = 0
+        self.sent_bytes = 0
+        self.received_bytes = 0
+
+    def sample(self, index):
+        t = index / self.rate
+        values = [math.sin(2 * math.pi * (t + channel / len(self.channels))) * 100 for channel in range(len(self.channels))]
+        if self.binary:
+            return pack_binary_channels(values)
+        return ("".join(f"{name}={value:.3f} " for name, value in zip(self.channels, values)).rstrip() + "\n").encode()
+
+    def stop(self, timeout=1.0):
+        self.stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+        os.close(self.master)
+
+    def run(self):
+        # 每毫秒把到期的样本一次写出, 高频率时不用每个样本单独唤醒
+        started_at = time.monotonic()
+        pending = b""
+        while not self.stop_event.wait(0.001):
+            try:
+                while True:
+                    self.received_bytes += len(os.read(self.master, 65536))
+            except (BlockingIOError, OSError):
+                pass
+            due = int((time.monotonic() - started_at) * self.rate)
+            if due > self.sent_samples and not pending:
+                pending = b"".join(self.sample(index) for index in range(self.sent_samples, due))
+                self.sent_samples = due
+            if pending:
+                try:
+                    written = os.write(self.master, pending)
+                except BlockingIOError:
+                    written = 0  # 对端读取跟不上, 下次再写
+                except OSError:
+                    return
+                pending = pending[written:]
+                self.sent_bytes += written
+
+
+def open_serial_transport(port, baudrate, bytesize, parity, stopbits):
+    # 返回 (与 serial.Serial 接口相同的传输, 模拟设备或 None)
+    # 支持串口设备名和 pySerial 的 URL(socket://、loop://、rfc2217:// 等), 另外支持 udp:// 和 sim://
+    if port.startswith("udp://"):
+        return SerialUdpTransport(port), None
+    if port.startswith("sim://"):
+        if os.name != 'posix':
+            raise ValueError("模拟设备只支持 Linux/macOS")
+        simulator = SimulatedSerialDevice(port)
+        try:
+            transport = serial.Serial(simulator.device_name, baudrate, bytesize, parity, stopbits, timeout=0)
+        except Exception:
+            simulator.stop()  # 线程还没有启动, 这里只关闭 pty 主端
+            raise
+        finally:
+            os.close(simulator.slave)
+        simulator.start()
+        return transport, simulator
+    return serial.serial_for_url(port, baudrate, bytesize, parity, stopbits, timeout=0), None
+
+
 # 定义属性组
 
 
 class SerialConnection:
-    def __init__(self, port, baudrate, bytesize, parity, stopbits):
+    def __init__(self, port, baudrate, bytesize, parity, stopbits, name="", settings=None):
+        self.name = name or port
         self.port = port
         self.baudrate = baudrate
         self.bytesize = bytesize
-        self.serial = serial.Serial(port, baudrate, bytesize, parity, stopbits)
+        # timeout=0: 读取只取已经到达的数据, 由接收线程负责等待
+        self.serial, self.simulator = open_serial_transport(port, baudrate, bytesize, parity, stopbits)
+        self.datagram = getattr(self.serial, "datagram", False)
+        if settings is None:
+            settings = SERIAL_DEFAULT_RECEIVE_SETTINGS
+        # settings/parser 由主线程写入, 通过控制队列同步给接收线程
+        self.settings = settings
+        self.parser = None
+        # 以下只在接收线程中使用
+        self.receive_settings = settings
+        self.receive_parser = None
+        self.framer = SerialLineFramer(settings.delimiter)
+        self.log_buffer = serial_log_buffer
+        self.frame_errors = 0  # 二进制模式下校验失败的帧数
+        self.error = ""  # 最近一次读取失败的原因, 出错后该端口停止接收
+        self.io_backend = None  # 由 SerialConnectionManager 设置
+        self.write_queue = SerialWriteQueue()
+        self.metrics = None  # 开启性能指标时为 SerialConnectionMetrics, 关闭时接收线程只多一次 None 判断
+        self.capture = None  # 录制原始数据时为 SerialCaptureWriter
+        self.capture_error = ""  # 最近一次开始录制失败的原因
+        self.last_read_time = 0.0  # 录制模式下上一次读到数据的时间, 只在接收线程中使用
+
+    def write(self, data, key=None):
+        # 不会阻塞调用方; 返回 False 表示发送队列已满, 数据被丢弃
+        # key 用于周期性消息: 同一个 key 还没发出的旧消息会被新消息覆盖
+        if self.io_backend is None:
+            self.serial.write(data)
+            return True
+        return self.io_backend.write(self, data, key)
+
+    def close(self):
+        self.serial.close()
+        if self.simulator is not None:
+            self.simulator.stop()
+        stop_serial_capture(self)
+
+    def fileno(self):
+        # 不支持 fileno 的端口(Windows 串口、部分 URL 端口)由接收线程轮询
+        try:
+            return self.serial.fileno()
+        except Exception:
+            return None
+
+    def apply_settings(self, settings):
+        if settings.delimiter != self.framer.delimiter:
+            self.framer = SerialLineFramer(settings.delimiter)
+        self.receive_settings = settings
+
+    def read_frames(self):
+        # 一次读出缓冲区中的全部字节, 再交给分帧器
+        serial_port = self.serial
+        chunk = serial_port.read(min(serial_port.in_waiting, SERIAL_READ_CHUNK_SIZE) or 1)
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.bytes_in += len(chunk)
+        capture = self.capture
+        if capture is not None and chunk:
+            capture.append(chunk)
+        return self.framer.feed(chunk)
+
+    def handle_frames(self, frames):
+        settings = self.receive_settings
+        parser = self.receive_parser
+        if parser is not None and parser.binary != settings.binary:
+            parser = None  # 刚切换协议, 等待主线程发来对应的解析器
+        recorder = serial_sample_recorder
+        if recorder is not None:
+            # 一次读取会得到多帧, 把它们均匀分布在上一次读取和这一次读取之间, 每个样本都有自己的时间
+            now = time.perf_counter()
+            start = max(self.last_read_time, now - SERIAL_RECORD_SPREAD_LIMIT)
+            step = (now - start) / max(len(frames), 1)
+            self.last_read_time = now
+        for index, data in enumerate(frames):
+            if settings.binary:
+                channel_values = unpack_binary_frame(data)
+                if channel_values is None:
+                    self.frame_errors += 1
+                    continue
+                slot_values = parser.parse_slots(channel_values) if parser is not None else ()
+                if settings.log_enabled:
+                    data = " ".join(f"{channel}={value:g}" for channel, value in channel_values)
+            else:
+                data = data.decode(settings.encoding, errors='ignore').strip()
+                # 在接收线程中完成解析, 数值直接写入最新值寄存器, 主线程只负责把数值写入属性
+                slot_values = parser.parse_slots(data) if parser is not None else ()
+            if parser is not None:
+                latest_values = parser.latest_values
+                for slot, value in slot_values:
+                    latest_values.write(slot, value)
+                if recorder is not None and slot_values:
+                    recorder.record(start + (index + 1) * step, slot_values)
+            if settings.log_enabled:
+                # 只写入环形缓冲区,由常驻的 serial_data_update 定时器按显示数量同步到界面
+                self.log_buffer.append(self.name, data)
 
 
 class ServoDataSender:
-    def __init__(self, serial_connection):
+    def __init__(self, serial_connection, channel_table):
         self.serial_connection = serial_connection
+        self.channel_table = channel_table
 
     def pack_servo_data(self, servos):
         # servos 是一个包含多个舵机数据的列表，每个元素是一个 (编号, 角度) 的元组
@@ -55,14 +314,76 @@ class ServoDataSender:
             data_str += f's{servo_id:03d}a{angle:.2f}'
         return data_str
 
-    def collect_and_send_servo_data(self):
-        arm1_data = math.degrees(bpy.data.objects['Armature'].pose.bones['arm1'].rotation_euler[2]) + 90
-        arm2_data = -math.degrees(bpy.data.objects['Armature'].pose.bones['arm2'].rotation_euler[0]) + 90
-        arm3_data = math.degrees(bpy.data.objects['Armature'].pose.bones['arm3'].rotation_euler[0]) + 140
-        servos = [(1, arm1_data), (2, arm2_data), (3, arm3_data)]
-        packed_data = self.pack_servo_data(servos)
-        self.serial_connection.serial.write(packed_data.encode())
-        print(packed_data)  # 打印输出数据
+    def collect_and_send_servo_data(self, armature):
+        self.channel_table.gather(armature)
+        return self.serial_connection.write(self.channel_table.pack(self.serial_connection.settings.binary))
+
+
+SERVO_AXIS_INDEX = {'X': 0, 'Y': 1, 'Z': 2}
+
+
+class ServoChannelTable:
+    # 舵机通道表: 每个通道对应骨骼的一个欧拉旋转轴, 角度 = 弧度 * 系数 + 偏移, 再限制在最小/最大值之间
+    # 所有骨骼的旋转用一次 foreach_get 读入 rotations, 数据包的缓冲区和格式串都预先生成
+    def __init__(self, armature, channel_items):
+        bones = armature.pose.bones
+        self.bone_count = len(bones)
+        self.rotations = array.array('f', bytes(12 * self.bone_count))
+        self.channels = []  # (rotations 中的位置, 系数, 偏移, 最小值, 最大值)
+        self.ids = []
+        for item in channel_items:
+            bone_index = bones.find(item.bone_name)
+            if bone_index < 0:
+                print(f"舵机{item.servo_id}的骨骼{item.bone_name}不存在")
+                continue
+            factor = math.degrees(1) * item.scale * (-1 if item.invert else 1)
+            self.channels.append((bone_index * 3 + SERVO_AXIS_INDEX[item.rotation_axis], factor, item.offset, item.min_angle, item.max_angle))
+            self.ids.append(item.servo_id)
+        self.angles = array.array('f', bytes(4 * len(self.channels)))
+        # 文本格式与 pack_servo_data 相同: s001a90.00s002a45.00...
+        self.text_format = "".join(f"s{servo_id:03d}a%.2f" for servo_id in self.ids)
+        # 二进制格式与 pack_binary_pairs 相同, 舵机编号预先写好, 每次只填数值
+        self.payload = bytearray(struct.pack('<BB', SERIAL_BINARY_PAIRS, len(self.ids)) + bytes(SERIAL_BINARY_PAIR.size * len(self.ids)))
+        for i, servo_id in enumerate(self.ids):
+            self.payload[2 + i * SERIAL_BINARY_PAIR.size] = servo_id
+
+    def gather(self, armature):
+        # 必须在主线程调用
+        armature.pose.bones.foreach_get("rotation_euler", self.rotations)
+        rotations = self.rotations
+        angles = self.angles
+        for i, (position, factor, offset, minimum, maximum) in enumerate(self.channels):
+            angle = rotations[position] * factor + offset
+            angles[i] = minimum if angle < minimum else maximum if angle > maximum else angle
+        return angles
+
+    def pack(self, binary):
+        if not binary:
+            return (self.text_format % tuple(self.angles)).encode()
+        payload = self.payload
+        for i, angle in enumerate(self.angles):
+            SERVO_ANGLE.pack_into(payload, 3 + i * SERIAL_BINARY_PAIR.size, angle)
+        return seal_binary_frame(payload)
+
+
+servo_channel_table = None
+
+
+def get_servo_channel_table(scene):
+    # 没有设置骨架时返回 None; 骨骼数量变化(如编辑模式下增删骨骼)后自动重建
+    global servo_channel_table
+    armature = scene.serial_helper.servo_armature
+    if armature is None or armature.pose is None:
+        return None
+    if servo_channel_table is None or servo_channel_table.bone_count != len(armature.pose.bones):
+        servo_channel_table = ServoChannelTable(armature, scene.serial_helper.servo_channels)
+    return servo_channel_table
+
+
+def invalidate_servo_channel_table(self=None, context=None):
+    # 用作舵机通道和骨架的 update 回调, 通道增删时也要调用
+    global servo_channel_table
+    servo_channel_table = None
 
 
 def extract_value(input_str, var_name):
@@ -81,71 +402,1676 @@ def extract_value(input_str, var_name):
         return None
 
 
-data_queue = queue.Queue()
+# 数值部分与 extract_value 相同, 另外允许带符号的整数
+SERIAL_NUMBER_PATTERN = r"[-+]?(?:\d*\.\d+|\d+)"
+
+
+class SerialDataParser:
+    binary = False
+
+    # 匹配名称列表变化时才重新编译: 所有名称合并成一个正则, 每行只扫描一遍
+    def __init__(self, names):
+        self.names = tuple(names)
+        # 名称 -> 在 serial_data_matching_list 中的位置, 同一名称可以对应多项
+        self.slots = {}
+        for slot, name in enumerate(self.names):
+            self.slots.setdefault(name, []).append(slot)
+        # 每个位置的最新值, 与解析器一起替换, 不会把旧列表的位置写到新列表上
+        self.latest_values = ChannelValueStore(len(self.names))
+        # 长名称优先, 避免 "x" 抢先匹配 "ax=1" 中的一部分
+        unique_names = sorted({name for name in self.names if name}, key=len, reverse=True)
+        if unique_names:
+            alternation = "|".join(re.escape(name) for name in unique_names)
+            self.pattern = re.compile(fr"({alternation})=({SERIAL_NUMBER_PATTERN})")
+        else:
+            self.pattern = None
+
+    def parse(self, input_str):
+        # 返回 名称->数值 的字典, 同名多次出现时与 extract_value 一样取第一个
+        values = {}
+        if self.pattern is None:
+            return values
+        for name, number in self.pattern.findall(input_str):
+            if name not in values:
+                values[name] = float(number)
+        return values
+
+    def parse_slots(self, input_str):
+        # 返回 (位置, 数值) 列表, 主线程只需按位置赋值
+        slot_values = []
+        for name, value in self.parse(input_str).items():
+            for slot in self.slots[name]:
+                slot_values.append((slot, value))
+        return slot_values
+
+
+class ChannelValueStore:
+    # 按匹配位置预分配的"最新值"寄存器: 接收线程覆盖写入, 主线程按序号取出有变化的位置
+    # 只有一个写线程和一个读线程, 先写值再递增序号, 不需要加锁
+    def __init__(self, size):
+        self.values = array.array('d', bytes(8 * size))
+        self.sequence = array.array('Q', bytes(8 * size))
+        self.read_sequence = array.array('Q', bytes(8 * size))
+        self.dropped = 0  # 被新值覆盖、主线程没来得及读取的样本数
+
+    def write(self, slot, value):
+        self.values[slot] = value
+        self.sequence[slot] += 1
+
+    def read_changed(self):
+        # 返回 ([(位置, 最新值), ...], 自上次读取以来写入的样本总数)
+        changed = []
+        samples = 0
+        sequence = self.sequence
+        read_sequence = self.read_sequence
+        for slot in range(len(sequence)):
+            current = sequence[slot]
+            pending = current - read_sequence[slot]
+            if pending:
+                read_sequence[slot] = current
+                changed.append((slot, self.values[slot]))
+                samples += pending
+                self.dropped += pending - 1
+        return changed, samples
+
+
+class SerialSampleRecorder:
+    # 录制模式: 接收线程把每个解析出的样本连同接收时间写入按匹配位置预分配的数组, 不经过主线程
+    # 容量不够时翻倍, 停止后主线程一次性取出写成关键帧
+    def __init__(self, slot_count, capacity=4096):
+        self.lock = threading.Lock()
+        self.recording = True
+        self.started_at = time.perf_counter()
+        self.times = [array.array('d', bytes(8 * capacity)) for _ in range(slot_count)]
+        self.values = [array.array('d', bytes(8 * capacity)) for _ in range(slot_count)]
+        self.counts = array.array('Q', bytes(8 * slot_count))
+
+    def record(self, timestamp, slot_values):
+        with self.lock:
+            if not self.recording:
+                return
+            counts = self.counts
+            for slot, value in slot_values:
+                if slot >= len(counts):
+                    continue  # 录制开始后新增的匹配项不录制
+                count = counts[slot]
+                times = self.times[slot]
+                if count == len(times):
+                    times.frombytes(bytes(8 * count))
+                    self.values[slot].frombytes(bytes(8 * count))
+                times[count] = timestamp
+                self.values[slot][count] = value
+                counts[slot] = count + 1
+
+    def stop(self):
+        with self.lock:
+            self.recording = False
+
+    def samples(self, slot):
+        # 返回 (相对开始时间的秒数, 数值), 只能在 stop 之后调用
+        count = self.counts[slot]
+        started_at = self.started_at
+        return array.array('d', (t - started_at for t in self.times[slot][:count])), self.values[slot][:count]
+
+    def sample_count(self):
+        return sum(self.counts)
+
+
+serial_sample_recorder = None
+# 空闲后第一次读到的多帧最多向前分布的时间(秒)
+SERIAL_RECORD_SPREAD_LIMIT = 0.05
+
+
+# 二进制协议: 帧内容 = 帧类型 + 数据 + CRC16(小端), 整帧做 COBS 编码后以 0x00 结尾
+# SERIAL_BINARY_CHANNELS: <BBB 类型, 起始通道, 数量> + 数量 * float32, 适合连续通道
+# SERIAL_BINARY_PAIRS:    <BB 类型, 数量> + 数量 * <B 通道, float32>, 适合不连续的通道(如舵机编号)
+SERIAL_BINARY_CHANNELS = 0x01
+SERIAL_BINARY_PAIRS = 0x02
+SERIAL_BINARY_PAIR = struct.Struct('<Bf')
+SERVO_ANGLE = struct.Struct('<f')
+# 一帧最多的通道数, 以及通道号能表示的通道总数
+SERIAL_BINARY_FRAME_CHANNELS = 255
+SERIAL_BINARY_MAX_CHANNELS = 256
+
+
+def cobs_encode(data):
+    # 按 0x00 切开后整段拷贝, 不逐字节处理
+    encoded = bytearray()
+    for block in bytes(data).split(b"\0"):
+        while len(block) >= 254:
+            encoded.append(255)
+            encoded += block[:254]
+            block = block[254:]
+        encoded.append(len(block) + 1)
+        encoded += block
+    return bytes(encoded)
+
+
+def cobs_decode(data):
+    decoded = bytearray()
+    index = 0
+    size = len(data)
+    while index < size:
+        code = data[index]
+        end = index + code
+        if code == 0 or end > size:
+            raise ValueError("COBS 数据格式错误")
+        decoded += data[index + 1:end]
+        index = end
+        if code < 255 and index < size:
+            decoded.append(0)
+    return bytes(decoded)
+
+
+def float_array_from_le(data):
+    values = array.array('f')
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def float_array_to_le(values):
+    values = array.array('f', values)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+
+def seal_binary_frame(payload):
+    # 加上 CRC 并做 COBS 编码, 返回可以直接写入串口的字节
+    crc = binascii.crc_hqx(payload, 0xFFFF)
+    return cobs_encode(payload + struct.pack('<H', crc)) + b"\0"
+
+
+def pack_binary_channels(values, first_channel=0):
+    # 数量字段是 u8, 超过 SERIAL_BINARY_FRAME_CHANNELS 个通道时拆成多帧连续发送
+    # 通道号也是 u8, 只能表示 0-255, 超出时抛出 ValueError
+    values = list(values)
+    if first_channel + len(values) > SERIAL_BINARY_MAX_CHANNELS:
+        raise ValueError(f"二进制协议最多 {SERIAL_BINARY_MAX_CHANNELS} 个通道, 当前 {first_channel + len(values)} 个")
+    frames = []
+    for start in range(0, max(len(values), 1), SERIAL_BINARY_FRAME_CHANNELS):
+        chunk = values[start:start + SERIAL_BINARY_FRAME_CHANNELS]
+        frames.append(seal_binary_frame(struct.pack('<BBB', SERIAL_BINARY_CHANNELS, first_channel + start, len(chunk)) + float_array_to_le(chunk)))
+    return b"".join(frames)
+
+
+def pack_binary_pairs(pairs):
+    payload = bytearray(struct.pack('<BB', SERIAL_BINARY_PAIRS, len(pairs)))
+    for channel, value in pairs:
+        payload += SERIAL_BINARY_PAIR.pack(channel, value)
+    return seal_binary_frame(bytes(payload))
+
+
+def unpack_binary_frame(frame):
+    # frame 是去掉结尾 0x00 的一帧, 返回 [(通道, 数值), ...], 校验失败时返回 None
+    try:
+        payload = cobs_decode(frame)
+    except ValueError:
+        return None
+    if len(payload) < 4 or binascii.crc_hqx(payload[:-2], 0xFFFF) != struct.unpack_from('<H', payload, len(payload) - 2)[0]:
+        return None
+    frame_type = payload[0]
+    if frame_type == SERIAL_BINARY_CHANNELS and len(payload) >= 5:
+        first_channel, count = payload[1], payload[2]
+        if len(payload) != 5 + 4 * count:
+            return None
+        return list(zip(range(first_channel, first_channel + count), float_array_from_le(payload[3:-2])))
+    if frame_type == SERIAL_BINARY_PAIRS:
+        count = payload[1]
+        if len(payload) != 4 + SERIAL_BINARY_PAIR.size * count:
+            return None
+        return list(SERIAL_BINARY_PAIR.iter_unpack(payload[2:-2]))
+    return None
+
+
+class SerialBinaryDecoder:
+    # 二进制模式下代替 SerialDataParser: 按通道号把一帧的数值映射到匹配列表的位置
+    binary = True
+
+    def __init__(self, channels):
+        self.channels = tuple(channels)
+        self.slots = {}
+        for slot, channel in enumerate(self.channels):
+            self.slots.setdefault(channel, []).append(slot)
+        self.latest_values = ChannelValueStore(len(self.channels))
+
+    def parse_slots(self, channel_values):
+        slot_values = []
+        slots = self.slots
+        for channel, value in channel_values:
+            for slot in slots.get(channel, ()):
+                slot_values.append((slot, value))
+        return slot_values
+
+
+# 匹配列表变化后置为 True, 由 serial_data_update 为每个连接重建解析器
+serial_data_parsers_dirty = True
+
+
+def build_serial_data_parser(scene, connection):
+    # 每个连接只解析属于自己的匹配项, 其余位置用 None 占位, 保证位置与匹配列表一致
+    matching_list = scene.serial_helper.serial_data_matching_list
+    owned = [not item.connection_name or item.connection_name == connection.name for item in matching_list]
+    if connection.settings.binary:
+        # binary_channel 为 -1 时使用该项在列表中的位置作为通道号
+        return SerialBinaryDecoder((slot if item.binary_channel < 0 else item.binary_channel) if owned[slot] else None for slot, item in enumerate(matching_list))
+    return SerialDataParser(item.matching_data_name if owned[slot] else None for slot, item in enumerate(matching_list))
+
+
+def update_serial_data_parsers(scene, manager):
+    global serial_data_parsers_dirty
+    if not serial_data_parsers_dirty:
+        return
+    serial_data_parsers_dirty = False
+    for connection in manager.connections.values():
+        connection.parser = build_serial_data_parser(scene, connection)
+        # 解析在接收线程中进行, 把新的解析器交给它
+        manager.io_backend.set_parser(connection, connection.parser)
+
+
+def invalidate_serial_data_parser(self=None, context=None):
+    # 同时用作 matching_data_name、binary_channel、connection_name 的 update 回调
+    global serial_data_parsers_dirty
+    serial_data_parsers_dirty = True
+
+
+class ReceiveTimingStats:
+    # 累计接收线程(解码+解析)与主线程(写入属性)处理每条数据的耗时
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.worker_time = 0.0
+        self.worker_samples = 0
+        self.main_time = 0.0
+        self.main_samples = 0
+
+    def add_worker(self, seconds, samples=1):
+        self.worker_time += seconds
+        self.worker_samples += samples
+
+    def add_main(self, seconds, samples):
+        self.main_time += seconds
+        self.main_samples += samples
+
+    def worker_us_per_sample(self):
+        return self.worker_time / self.worker_samples * 1e6 if self.worker_samples else 0.0
+
+    def main_us_per_sample(self):
+        return self.main_time / self.main_samples * 1e6 if self.main_samples else 0.0
+
+
+receive_timing_stats = ReceiveTimingStats()
+
+
+class SerialConnectionMetrics:
+    # 每个连接的累计计数, 只由接收线程累加; 发送方向的计数在 SerialWriteQueue 中
+    def __init__(self):
+        self.bytes_in = 0
+        self.lines_in = 0
+        self.parse_time = 0.0
+        self.reader_cpu = 0.0  # 接收线程读取和解析该端口所用的 CPU 时间
+
+
+# 导出 CSV 时的列, 也是 SerialMetrics.sample 中每行的字段
+SERIAL_METRICS_FIELDS = [
+    "time", "connection",
+    "bytes_in_per_sec", "lines_in_per_sec", "bytes_out_per_sec", "packets_out_per_sec",
+    "queue_bytes", "queue_packets", "dropped_samples", "dropped_packets", "frame_errors",
+    "parse_us_per_line", "write_latency_ms", "reader_cpu_percent",
+    "drain_ms", "drain_max_ms", "refresh_ms", "refresh_max_ms",
+]
+# 采样间隔(秒)和保留的采样行数
+SERIAL_METRICS_INTERVAL = 1.0
+SERIAL_METRICS_HISTORY = 36000
+
+
+class SerialMetrics:
+    # 性能指标: 默认关闭, 关闭时各处只多一次判断
+    # 开启后由 serial_data_update 每秒采样一次, 把累计计数换算成每秒的速率, 保存到 history
+    def __init__(self):
+        self.enabled = False
+        self.history = collections.deque(maxlen=SERIAL_METRICS_HISTORY)
+        self.latest = {}  # 连接名 -> 最近一次采样的一行
+        self.reset()
+
+    def reset(self):
+        self.last_sample = time.monotonic()
+        self.previous = {}  # 连接 -> 上次采样时的累计值
+        self.drain_time = 0.0
+        self.drain_ticks = 0
+        self.drain_max = 0.0
+        self.refresh_time = 0.0
+        self.refreshes = 0
+        self.refresh_max = 0.0
+
+    def add_drain(self, seconds):
+        self.drain_time += seconds
+        self.drain_ticks += 1
+        self.drain_max = max(self.drain_max, seconds)
+
+    def add_refresh(self, seconds):
+        self.refresh_time += seconds
+        self.refreshes += 1
+        self.refresh_max = max(self.refresh_max, seconds)
+
+    def sample_due(self):
+        return time.monotonic() - self.last_sample >= SERIAL_METRICS_INTERVAL
+
+    def sample(self, connections):
+        now = time.monotonic()
+        elapsed = max(now - self.last_sample, 1e-9)
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        rows = {}
+        for connection in connections:
+            metrics = connection.metrics
+            if metrics is None:
+                continue
+            write_queue = connection.write_queue
+            totals = (metrics.bytes_in, metrics.lines_in, write_queue.written_bytes, write_queue.write_count,
+                      metrics.parse_time, metrics.reader_cpu, write_queue.write_latency_total)
+            previous = self.previous.get(connection, (0,) * len(totals))
+            delta = [current - old for current, old in zip(totals, previous)]
+            self.previous[connection] = totals
+            rows[connection.name] = {
+                "time": timestamp,
+                "connection": connection.name,
+                "bytes_in_per_sec": delta[0] / elapsed,
+                "lines_in_per_sec": delta[1] / elapsed,
+                "bytes_out_per_sec": delta[2] / elapsed,
+                "packets_out_per_sec": delta[3] / elapsed,
+                "queue_bytes": write_queue.queued_bytes,
+                "queue_packets": len(write_queue.items),
+                "dropped_samples": connection.parser.latest_values.dropped if connection.parser is not None else 0,
+                "dropped_packets": write_queue.dropped,
+                "frame_errors": connection.frame_errors,
+                "parse_us_per_line": delta[4] / delta[1] * 1e6 if delta[1] else 0.0,
+                "write_latency_ms": delta[6] / delta[3] * 1000 if delta[3] else 0.0,
+                "reader_cpu_percent": delta[5] / elapsed * 100,
+                "drain_ms": self.drain_time / self.drain_ticks * 1000 if self.drain_ticks else 0.0,
+                "drain_max_ms": self.drain_max * 1000,
+                "refresh_ms": self.refresh_time / self.refreshes * 1000 if self.refreshes else 0.0,
+                "refresh_max_ms": self.refresh_max * 1000,
+            }
+        self.history.extend(rows.values())
+        self.latest = rows
+        previous = self.previous
+        self.reset()
+        self.previous = previous
+        self.last_sample = now
+        return rows
+
+    def export_csv(self, filepath):
+        with open(filepath, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=SERIAL_METRICS_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.history)
+        return len(self.history)
+
+
+serial_metrics = SerialMetrics()
+
+
+def set_serial_metrics_enabled(enabled):
+    # 性能指标 API: 开启/关闭所有连接的计数
+    serial_metrics.enabled = enabled
+    serial_metrics.reset()
+    serial_metrics.latest = {}
+    for connection in get_serial_connection_manager().connections.values():
+        connection.metrics = SerialConnectionMetrics() if enabled else None
+
+
+def get_serial_metrics():
+    # 性能指标 API: 返回 {连接名: 最近一次采样的指标}, 字段见 SERIAL_METRICS_FIELDS
+    return dict(serial_metrics.latest)
+
+
+def export_serial_metrics_csv(filepath):
+    # 性能指标 API: 把保存的采样历史写成 CSV, 返回行数
+    return serial_metrics.export_csv(filepath)
+
+
+class SerialLogBuffer:
+    # 接收数据显示用的固定容量环形缓冲区, 放在 bpy 数据之外, 满了自动覆盖最旧的一行
+    def __init__(self, capacity):
+        self.lock = threading.Lock()
+        self.lines = collections.deque(maxlen=capacity)
+        self.count = 0  # 累计收到的行数, 同时作为行号
+        self.synced_count = -1  # 主线程上次同步到 serial_data_list 时的 count
+
+    def append(self, connection_name, data):
+        with self.lock:
+            self.count += 1
+            self.lines.append((self.count, connection_name, data))
+
+    def resize(self, capacity):
+        with self.lock:
+            if capacity != self.lines.maxlen:
+                self.lines = collections.deque(self.lines, maxlen=capacity)
+            self.synced_count = -1
+
+    def clear(self):
+        with self.lock:
+            self.lines.clear()
+            self.count = 0
+            self.synced_count = -1
+
+    def window(self, size):
+        # 最新的 size 行, 按从旧到新排列
+        with self.lock:
+            window = list(itertools.islice(reversed(self.lines), size))
+        window.reverse()
+        return window
+
+
+serial_log_buffer = SerialLogBuffer(1000)
+
+
+# 原始数据录制文件: 文件头 + 标签, 之后是连续的数据块, 每块 = 块头 + (压缩后的)记录
+# 每条记录 = 时间戳(time.monotonic_ns) + 长度 + 一次读到的原始字节
+# 同名 .idx 文件是稀疏时间索引, 每个数据块一项(块内第一条记录的时间戳, 块在文件中的偏移)
+SERIAL_CAPTURE_MAGIC = b"SHCP"
+SERIAL_CAPTURE_VERSION = 1
+SERIAL_CAPTURE_HEADER = struct.Struct('<4sHHqdI')
+SERIAL_CAPTURE_BLOCK_MAGIC = b"SHCB"
+SERIAL_CAPTURE_BLOCK = struct.Struct('<4sB3xIIIqq')
+SERIAL_CAPTURE_RECORD = struct.Struct('<qI')
+SERIAL_CAPTURE_INDEX_ENTRY = struct.Struct('<qQ')
+# 每个数据块压缩前的大小上限, 写入线程的刷新间隔(秒), 以及内存中最多积压的字节数
+SERIAL_CAPTURE_BLOCK_SIZE = 256 * 1024
+SERIAL_CAPTURE_FLUSH_INTERVAL = 0.25
+SERIAL_CAPTURE_MAX_PENDING = 64 * 1024 * 1024
+# 块头中记录的压缩方式
+SERIAL_CAPTURE_CODECS = {'NONE': 0, 'ZLIB': 1, 'ZSTD': 2, 'LZ4': 3}
+
+
+def resolve_capture_codec(codec):
+    # 选择的压缩库没有安装时退回 zlib
+    if codec == 'AUTO':
+        codec = 'ZSTD' if zstandard is not None else 'LZ4' if lz4 is not None else 'ZLIB'
+    elif (codec == 'ZSTD' and zstandard is None) or (codec == 'LZ4' and lz4 is None):
+        print(f"没有安装 {codec} 压缩库, 改用 zlib")
+        codec = 'ZLIB'
+    return codec
+
+
+def make_capture_compressor(codec):
+    if codec == 'ZSTD':
+        return zstandard.ZstdCompressor(level=3).compress
+    if codec == 'LZ4':
+        return lz4.frame.compress
+    if codec == 'ZLIB':
+        return lambda data: zlib.compress(data, 1)
+    return None
+
+
+def decompress_capture_block(codec_id, payload, raw_size):
+    if codec_id == SERIAL_CAPTURE_CODECS['NONE']:
+        return payload
+    if codec_id == SERIAL_CAPTURE_CODECS['ZLIB']:
+        return zlib.decompress(payload)
+    if codec_id == SERIAL_CAPTURE_CODECS['ZSTD']:
+        if zstandard is None:
+            raise ValueError("读取该文件需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(payload, max_output_size=raw_size)
+    if codec_id == SERIAL_CAPTURE_CODECS['LZ4']:
+        if lz4 is None:
+            raise ValueError("读取该文件需要安装 lz4")
+        return lz4.frame.decompress(payload)
+    raise ValueError(f"未知的压缩方式 {codec_id}")
+
+
+class SerialCaptureWriter(threading.Thread):
+    # 把一个连接收到的原始字节连同时间戳追加写入录制文件
+    # 接收线程只调用 append: 把 (时间戳, 数据) 放进 deque, 不加锁也不做文件操作
+    # 写入线程每 SERIAL_CAPTURE_FLUSH_INTERVAL 秒把积压的记录打包成块, 压缩后写入文件
+    # 积压超过 SERIAL_CAPTURE_MAX_PENDING 或写入出错时直接丢弃新数据并计数, 不会拖慢接收
+    def __init__(self, filepath, label="", codec='AUTO'):
+        threading.Thread.__init__(self, daemon=True)
+        self.filepath = filepath
+        self.codec = resolve_capture_codec(codec)
+        self.compress = make_capture_compressor(self.codec)
+        self.records = collections.deque()
+        self.stop_event = threading.Event()
+        self.captured_bytes = 0  # 只由接收线程累加
+        self.dropped_bytes = 0  # 只由接收线程累加
+        self.written_bytes = 0  # 只由写入线程累加, 已写入文件的原始字节数
+        self.block_count = 0
+        self.error = ""
+        self.file = open(filepath, 'wb')
+        try:
+            self.index_file = open(filepath + ".idx", 'wb')
+            label = label.encode('utf-8')
+            self.file.write(SERIAL_CAPTURE_HEADER.pack(SERIAL_CAPTURE_MAGIC, SERIAL_CAPTURE_VERSION, 0, time.monotonic_ns(), time.time(), len(label)))
+            self.file.write(label)
+            self.file.flush()
+        except Exception:
+            self.file.close()
+            raise
+        self.file_size = SERIAL_CAPTURE_HEADER.size + len(label)
+
+    def append(self, chunk):
+        if self.error or self.captured_bytes - self.written_bytes >= SERIAL_CAPTURE_MAX_PENDING:
+            self.dropped_bytes += len(chunk)
+            return
+        self.records.append((time.monotonic_ns(), chunk))
+        self.captured_bytes += len(chunk)
+
+    def stop(self, timeout=2.0):
+        # 停止前把剩余的记录全部写入
+        self.stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def write_block(self, parts, raw_size, record_count, first_ns, last_ns):
+        raw = b"".join(parts)
+        codec_id = SERIAL_CAPTURE_CODECS[self.codec]
+        payload = self.compress(raw) if self.compress is not None else raw
+        if len(payload) >= len(raw):
+            # 压缩不划算的块(例如已经压缩过的二进制数据)原样保存
+            codec_id = SERIAL_CAPTURE_CODECS['NONE']
+            payload = raw
+        offset = self.file_size
+        self.file.write(SERIAL_CAPTURE_BLOCK.pack(SERIAL_CAPTURE_BLOCK_MAGIC, codec_id, record_count, len(raw), len(payload), first_ns, last_ns))
+        self.file.write(payload)
+        self.index_file.write(SERIAL_CAPTURE_INDEX_ENTRY.pack(first_ns, offset))
+        self.file_size += SERIAL_CAPTURE_BLOCK.size + len(payload)
+        self.block_count += 1
+        self.written_bytes += raw_size
+
+    def flush(self):
+        records = self.records
+        if not records:
+            return
+        while records:
+            parts = []
+            block_size = 0
+            raw_size = 0
+            first_ns = records[0][0]
+            while records and block_size < SERIAL_CAPTURE_BLOCK_SIZE:
+                timestamp, chunk = records.popleft()
+                parts.append(SERIAL_CAPTURE_RECORD.pack(timestamp, len(chunk)))
+                parts.append(chunk)
+                block_size += SERIAL_CAPTURE_RECORD.size + len(chunk)
+                raw_size += len(chunk)
+            self.write_block(parts, raw_size, len(parts) // 2, first_ns, timestamp)
+        # 先让数据块落盘再写索引, 程序崩溃时索引最多比数据少几项, 读取时会重新扫描补上
+        self.file.flush()
+        self.index_file.flush()
+
+    def run(self):
+        try:
+            while not self.stop_event.wait(SERIAL_CAPTURE_FLUSH_INTERVAL):
+                self.flush()
+            self.flush()
+        except Exception as e:
+            print(f"原始数据录制写入失败({self.filepath}): {e}")
+            self.error = str(e)
+            self.records.clear()
+        finally:
+            self.file.close()
+            self.index_file.close()
+
+
+class SerialCaptureFile:
+    # 用 mmap 打开录制文件, 只解压用到的数据块, 不把整个文件读入内存
+    # 按时间查找时先在稀疏索引中二分查找数据块, 再在块内逐条比较
+    def __init__(self, filepath):
+        with open(filepath, 'rb') as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, _, self.start_ns, self.start_time, label_size = SERIAL_CAPTURE_HEADER.unpack_from(self.mmap, 0)
+            if magic != SERIAL_CAPTURE_MAGIC or version != SERIAL_CAPTURE_VERSION:
+                raise ValueError("不是串口助手的录制文件")
+        except (struct.error, ValueError):
+            self.mmap.close()
+            raise ValueError("不是串口助手的录制文件")
+        data_start = SERIAL_CAPTURE_HEADER.size + label_size
+        self.label = self.mmap[SERIAL_CAPTURE_HEADER.size:data_start].decode('utf-8', errors='replace')
+        self.block_times = array.array('q')
+        self.block_offsets = array.array('Q')
+        self.load_index(filepath + ".idx")
+        # 索引缺失或不完整(录制时程序崩溃)时从最后一个已知的块开始扫描块头补全
+        if self.block_offsets:
+            offset = self.block_offsets[-1]
+            offset += SERIAL_CAPTURE_BLOCK.size + self.block_header(offset)[3]
+        else:
+            offset = data_start
+        while True:
+            header = self.block_header(offset)
+            if header is None:
+                break
+            self.block_times.append(header[4])
+            self.block_offsets.append(offset)
+            offset += SERIAL_CAPTURE_BLOCK.size + header[3]
+
+    def load_index(self, index_path):
+        try:
+            with open(index_path, 'rb') as file:
+                data = file.read()
+        except OSError:
+            return
+        for first_ns, offset in SERIAL_CAPTURE_INDEX_ENTRY.iter_unpack(data[:len(data) - len(data) % SERIAL_CAPTURE_INDEX_ENTRY.size]):
+            if self.block_header(offset) is None:
+                break
+            self.block_times.append(first_ns)
+            self.block_offsets.append(offset)
+
+    def block_header(self, offset):
+        # 返回 (压缩方式, 记录数, 原始大小, 存储大小, 首条时间戳, 末条时间戳), 块不完整时返回 None
+        if offset + SERIAL_CAPTURE_BLOCK.size > len(self.mmap):
+            return None
+        magic, *header = SERIAL_CAPTURE_BLOCK.unpack_from(self.mmap, offset)
+        if magic != SERIAL_CAPTURE_BLOCK_MAGIC or offset + SERIAL_CAPTURE_BLOCK.size + header[3] > len(self.mmap):
+            return None
+        return header
+
+    @property
+    def block_count(self):
+        return len(self.block_offsets)
+
+    def time_range(self):
+        # 第一条和最后一条记录的时间戳
+        if not self.block_offsets:
+            return None
+        return self.block_times[0], self.block_header(self.block_offsets[-1])[5]
+
+    def find_block(self, timestamp_ns):
+        # 可能包含该时刻数据的第一个块
+        return max(bisect.bisect_right(self.block_times, timestamp_ns) - 1, 0)
+
+    def block_records(self, index):
+        offset = self.block_offsets[index]
+        codec_id, record_count, raw_size, stored_size, _, _ = self.block_header(offset)
+        payload_start = offset + SERIAL_CAPTURE_BLOCK.size
+        raw = decompress_capture_block(codec_id, self.mmap[payload_start:payload_start + stored_size], raw_size)
+        position = 0
+        for _ in range(record_count):
+            timestamp, size = SERIAL_CAPTURE_RECORD.unpack_from(raw, position)
+            position += SERIAL_CAPTURE_RECORD.size
+            yield timestamp, raw[position:position + size]
+            position += size
+
+    def records(self, start_ns=None, end_ns=None):
+        # 按时间顺序返回 [start_ns, end_ns] 内的 (时间戳, 原始字节)
+        first = self.find_block(start_ns) if start_ns is not None else 0
+        for index in range(first, len(self.block_offsets)):
+            if end_ns is not None and self.block_times[index] > end_ns:
+                return
+            for timestamp, data in self.block_records(index):
+                if start_ns is not None and timestamp < start_ns:
+                    continue
+                if end_ns is not None and timestamp > end_ns:
+                    return
+                yield timestamp, data
+
+    def close(self):
+        self.mmap.close()
+
+
+# 每次最多读取的字节数
+SERIAL_READ_CHUNK_SIZE = 65536
+# 一直收不到分隔符时, 缓冲区超过这个长度就整段作为一帧输出, 防止无限增长
+SERIAL_MAX_FRAME_SIZE = 65536
+
+SERIAL_DELIMITERS = {
+    'LF': b"\n",
+    'CRLF': b"\r\n",
+    'CR': b"\r",
+    'NUL': b"\0",
+}
+
+
+class SerialLineFramer:
+    # 增量分帧: 读到的数据块追加到同一个 bytearray 中, 按分隔符切出完整的帧, 剩余部分留到下一次
+    def __init__(self, delimiter=b"\n", max_frame_size=SERIAL_MAX_FRAME_SIZE):
+        self.delimiter = delimiter
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray()
+        self.scan_from = 0  # 之前已经确认没有分隔符的位置, 下次从这里继续查找
+
+    def feed(self, chunk):
+        buffer = self.buffer
+        buffer += chunk
+        delimiter = self.delimiter
+        frames = []
+        start = 0
+        end = buffer.find(delimiter, self.scan_from)
+        if end >= 0:
+            with memoryview(buffer) as view:
+                while end >= 0:
+                    frames.append(bytes(view[start:end]))
+                    start = end + len(delimiter)
+                    end = buffer.find(delimiter, start)
+            del buffer[:start]
+        if len(buffer) > self.max_frame_size:
+            frames.append(bytes(buffer))
+            buffer.clear()
+        # 分隔符可能被拆在两个数据块之间, 回退 len(delimiter) - 1 个字节
+        self.scan_from = max(0, len(buffer) - len(delimiter) + 1)
+        return frames
+
+    def reset(self):
+        self.buffer.clear()
+        self.scan_from = 0
+
+
+def parse_custom_delimiter(text):
+    # 自定义分隔符支持 \x03 这样的转义写法; 写法不完整(如以 \ 结尾)时返回 None
+    try:
+        return codecs.decode(text, 'unicode_escape').encode('latin-1')
+    except UnicodeError:
+        return None
+
+
+def get_serial_delimiter(connection_item):
+    if connection_item.serial_delimiter == 'CUSTOM':
+        delimiter = parse_custom_delimiter(connection_item.serial_custom_delimiter)
+        if delimiter is None:
+            # 无效的写法不生效, 已经打开的连接继续使用原来的分隔符
+            print(f"自定义分隔符 {connection_item.serial_custom_delimiter} 无效")
+            connection = get_serial_connection_manager().get(connection_item.name)
+            return connection.settings.delimiter if connection is not None else b"\n"
+        return delimiter or b"\n"
+    return SERIAL_DELIMITERS[connection_item.serial_delimiter]
+
+
+# 打开串口时从场景属性生成的接收设置快照, 接收线程只读取它, 不再访问 bpy
+SerialReceiveSettings = collections.namedtuple("SerialReceiveSettings", ["encoding", "stop_receiving", "log_enabled", "delimiter", "binary"])
+
+
+SERIAL_DEFAULT_RECEIVE_SETTINGS = SerialReceiveSettings(encoding='utf-8', stop_receiving=False, log_enabled=True, delimiter=b"\n", binary=False)
+
+
+def make_serial_receive_settings(scene, connection_item):
+    return SerialReceiveSettings(
+        encoding=connection_item.Encoding,
+        stop_receiving=connection_item.StopReceiving,
+        log_enabled=scene.serial_helper.serial_log_enabled,
+        delimiter=b"\0" if connection_item.serial_protocol == 'BINARY' else get_serial_delimiter(connection_item),
+        binary=connection_item.serial_protocol == 'BINARY',
+    )
+
+
+# 每次写入最多合并的字节数
+SERIAL_WRITE_COALESCE_SIZE = 4096
+
+
+class SerialWriteQueue:
+    # 每个连接的发送队列: 有字节数上限, 连续的小块数据合并成一次写入
+    # 带 key 的周期性消息(如定时发送)在队列中只保留最新的一条, 旧的直接被覆盖
+    # 队列满时按 policy 处理: 'DROP_OLD' 丢弃最旧的数据, 'DROP_NEW' 丢弃新数据
+    def __init__(self, max_bytes=64 * 1024, policy='DROP_OLD'):
+        self.condition = threading.Condition()
+        self.items = collections.deque()  # [key, data, 入队时间]
+        self.keyed = {}
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.closed = False
+        self.queued_bytes = 0
+        self.dropped = 0
+        self.write_count = 0
+        self.written_bytes = 0
+        self.write_latency_total = 0.0
+        self.write_latency_max = 0.0
+
+    def configure(self, max_bytes, policy):
+        with self.condition:
+            self.max_bytes = max_bytes
+            self.policy = policy
+
+    def put(self, data, key=None):
+        # 返回 False 表示数据被丢弃
+        with self.condition:
+            if self.closed:
+                return False
+            if len(data) > self.max_bytes:
+                # 比整个队列还大的数据放不进去, 不能为它清空队列
+                self.dropped += 1
+                return False
+            if key is not None and key in self.keyed:
+                item = self.keyed[key]
+                if not self.make_room(len(data) - len(item[1]), item):
+                    return False
+                self.queued_bytes += len(data) - len(item[1])
+                item[1] = data
+                self.dropped += 1  # 旧消息还没发出就被新的覆盖
+                return True
+            if not self.make_room(len(data)):
+                return False
+            item = [key, data, time.perf_counter()]
+            self.items.append(item)
+            if key is not None:
+                self.keyed[key] = item
+            self.queued_bytes += len(data)
+            self.condition.notify()
+            return True
+
+    def make_room(self, size, keep=None):
+        # 按 policy 为新增的 size 字节腾出空间, keep 是正在被覆盖的那一条, 不能丢弃; 放不下时返回 False
+        while self.queued_bytes + size > self.max_bytes:
+            index = 1 if self.items and self.items[0] is keep else 0
+            if self.policy != 'DROP_OLD' or index >= len(self.items):
+                self.dropped += 1
+                return False
+            key, data, _ = self.items[index]
+            del self.items[index]
+            if key is not None:
+                del self.keyed[key]
+            self.queued_bytes -= len(data)
+            self.dropped += 1
+        return True
+
+    def pop_item(self):
+        key, data, queued_at = self.items.popleft()
+        if key is not None:
+            del self.keyed[key]
+        self.queued_bytes -= len(data)
+        return data, queued_at
+
+    def take(self, timeout=0):
+        # 取出一批数据合并成一个 bytes, 返回 (数据, 各条的入队时间)
+        # timeout 为 None 时一直等到有数据或队列关闭, 关闭后返回 (None, ())
+        with self.condition:
+            if timeout != 0:
+                self.condition.wait_for(lambda: self.items or self.closed, timeout)
+            if not self.items:
+                return (None, ()) if self.closed else (b"", ())
+            chunks = []
+            queued_times = []
+            size = 0
+            while self.items and (not chunks or size + len(self.items[0][1]) <= SERIAL_WRITE_COALESCE_SIZE):
+                data, queued_at = self.pop_item()
+                chunks.append(data)
+                queued_times.append(queued_at)
+                size += len(data)
+            return b"".join(chunks), queued_times
+
+    def record_write(self, queued_times, size):
+        self.written_bytes += size
+        now = time.perf_counter()
+        for queued_at in queued_times:
+            latency = now - queued_at
+            self.write_latency_total += latency
+            self.write_latency_max = max(self.write_latency_max, latency)
+        self.write_count += len(queued_times)
+
+    def average_write_latency(self):
+        return self.write_latency_total / self.write_count if self.write_count else 0.0
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+# 有端口不支持 fileno 时的轮询间隔(秒)
+SERIAL_POLL_INTERVAL = 0.001
+
+
+def service_serial_connection(connection):
+    # 读取并处理一个端口上已经到达的数据, 出错时返回 False
+    try:
+        metrics = connection.metrics
+        if metrics is not None:
+            cpu_start = time.thread_time()
+        frames = connection.read_frames()
+        if frames:
+            start = time.perf_counter()
+            connection.handle_frames(frames)
+            elapsed = time.perf_counter() - start
+            receive_timing_stats.add_worker(elapsed, len(frames))
+            if metrics is not None:
+                metrics.lines_in += len(frames)
+                metrics.parse_time += elapsed
+        if metrics is not None:
+            metrics.reader_cpu += time.thread_time() - cpu_start
+        return True
+    except Exception as e:
+        # 端口出错(如设备被拔出)后停止接收该端口, 避免反复报错
+        print(f"数据接受失败({connection.name}): {e}")
+        connection.error = str(e)
+        return False
+
+
+def write_serial_connection(connection, data):
+    # 不阻塞地写出一块数据, 返回写出的字节数, 内核缓冲区已满时返回 0
+    fileno = connection.fileno()
+    try:
+        if fileno is None or connection.datagram or os.name != 'posix':
+            # 数据报要带上对方地址, 只能通过传输对象发送
+            return connection.serial.write(data) or len(data)
+        return os.write(fileno, data)
+    except BlockingIOError:
+        return 0
 
 
 class SerialHelperThread(threading.Thread):
-    def __init__(self, serial_connection):
-        threading.Thread.__init__(self)
-        self.serial_connection = serial_connection
+    # 一个线程服务所有打开的端口: 用 selectors 同时等待所有端口和唤醒用的 socket, 没有数据时不占用CPU
+    # 发送也在这个线程中完成: 主线程把数据放入发送队列后唤醒它, 内核缓冲区满时等端口可写(EVENT_WRITE)再继续
+    # 不支持 fileno 的端口按 SERIAL_POLL_INTERVAL 轮询
+    def __init__(self):
+        threading.Thread.__init__(self, daemon=True)
         self.should_terminate = False
-        self.data_queue = data_queue
+        self.connections = []
+        self.registered = {}  # 连接 -> 在 selector 中注册的事件
+        self.writing = set()  # 内核缓冲区已满, 等待可写的连接
+        self.unfinished_writes = {}  # 只写出了一部分的数据块: 连接 -> (剩余数据, 入队时间)
+        self.selector = selectors.DefaultSelector()
+        # 主线程通过控制队列发送连接、设置和解析器, 写入 wake_writer 唤醒 select
+        self.control_queue = queue.Queue()
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.wake_reader.setblocking(False)
+        self.wake_writer.setblocking(False)
+        self.selector.register(self.wake_reader, selectors.EVENT_READ, None)
+
+    def send_control(self, command, connection=None, value=None):
+        self.control_queue.put((command, connection, value))
+        try:
+            self.wake_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # 缓冲区已满说明已经有未处理的唤醒
+
+    def add_connection(self, connection):
+        self.send_control("add", connection)
+
+    def remove_connection(self, connection, timeout=1.0):
+        # 等接收线程放开该端口后再返回, 之后可以安全地关闭端口
+        done = threading.Event()
+        self.send_control("remove", connection, done)
+        if self.is_alive() and threading.current_thread() is not self:
+            done.wait(timeout)
+
+    def update_settings(self, connection, settings):
+        connection.settings = settings
+        self.send_control("settings", connection, settings)
+
+    def set_parser(self, connection, parser):
+        self.send_control("parser", connection, parser)
+
+    def stop(self, timeout=1.0):
+        self.send_control("terminate")
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def update_registration(self, connection):
+        fileno = connection.fileno()
+        if fileno is None:
+            return
+        events = 0
+        if connection in self.connections and not connection.receive_settings.stop_receiving and not connection.error:
+            events |= selectors.EVENT_READ
+        if connection in self.writing:
+            events |= selectors.EVENT_WRITE
+        registered = self.registered.get(connection, 0)
+        if events == registered:
+            return
+        if not registered:
+            self.selector.register(fileno, events, connection)
+        elif not events:
+            self.selector.unregister(fileno)
+        else:
+            self.selector.modify(fileno, events, connection)
+        if events:
+            self.registered[connection] = events
+        else:
+            del self.registered[connection]
+
+    def process_control(self):
+        while True:
+            try:
+                command, connection, value = self.control_queue.get_nowait()
+            except queue.Empty:
+                return
+            if command == "add":
+                self.connections.append(connection)
+                fileno = connection.fileno()
+                if fileno is not None and os.name == 'posix':
+                    os.set_blocking(fileno, False)
+            elif command == "remove":
+                if connection in self.connections:
+                    self.connections.remove(connection)
+                self.writing.discard(connection)
+                self.unfinished_writes.pop(connection, None)
+                connection.write_queue.close()
+                self.update_registration(connection)
+                value.set()
+                continue
+            elif command == "write":
+                if connection in self.connections and connection not in self.writing:
+                    self.flush(connection)
+                continue
+            elif command == "settings":
+                connection.apply_settings(value)
+            elif command == "parser":
+                connection.receive_parser = value
+            elif command == "terminate":
+                self.should_terminate = True
+                continue
+            self.update_registration(connection)
+
+    def service(self, connection):
+        if not service_serial_connection(connection):
+            self.update_registration(connection)
+
+    def write(self, connection, data, key=None):
+        # 发送队列满时按队列的策略丢弃, 起到背压作用
+        if not connection.write_queue.put(bytes(data), key):
+            return False
+        self.send_control("write", connection)
+        return True
+
+    def flush(self, connection):
+        # 每次从队列取出合并后的一块数据写入, 内核缓冲区满时登记 EVENT_WRITE, 等端口可写后继续
+        write_queue = connection.write_queue
+        while True:
+            if connection in self.unfinished_writes:
+                data, queued_times = self.unfinished_writes.pop(connection)
+            else:
+                data, queued_times = write_queue.take()
+                if not data:
+                    break
+            try:
+                written = write_serial_connection(connection, data)
+            except OSError as e:
+                print(f"数据发送失败({connection.name}): {e}")
+                continue
+            if written < len(data):
+                self.unfinished_writes[connection] = (data[written:], queued_times)
+                self.writing.add(connection)
+                self.update_registration(connection)
+                return
+            write_queue.record_write(queued_times, len(data))
+        if connection in self.writing:
+            self.writing.discard(connection)
+            self.update_registration(connection)
 
     def run(self):
-        while not self.should_terminate:
-            if not bpy.context.scene.serial_helper.StopReceiving:
-                try:
-                    data = self.serial_connection.serial.readline()
-                    data = data.decode(bpy.context.scene.serial_helper.Encoding, errors='ignore').strip()
-                    self.data_queue.put(data)
-                    bpy.app.timers.register(serial_data_update)
-                except Exception as e:
-                    print(f"数据接受失败: {e}")
+        try:
+            while True:
+                self.process_control()
+                if self.should_terminate:
+                    break
+                polled = [connection for connection in self.connections
+                          if connection.fileno() is None
+                          and not connection.receive_settings.stop_receiving and not connection.error]
+                # 不能 select 的端口写不完时也只能轮询
+                polled_writes = [connection for connection in self.writing if connection.fileno() is None]
+                # 全部端口都暂停或都能 select 时一直阻塞, 直到有数据或控制消息
+                events = self.selector.select(SERIAL_POLL_INTERVAL if polled or polled_writes else None)
+                for key, mask in events:
+                    if key.data is None:
+                        try:
+                            while self.wake_reader.recv(4096):
+                                pass
+                        except (BlockingIOError, OSError):
+                            pass
+                        continue
+                    if mask & selectors.EVENT_READ:
+                        self.service(key.data)
+                    if mask & selectors.EVENT_WRITE and key.data in self.writing:
+                        self.flush(key.data)
+                for connection in polled:
+                    try:
+                        waiting = connection.serial.in_waiting
+                    except Exception as e:
+                        # 端口出错(如 USB 转串口被拔出)时只停止该端口, 不能让异常结束整个接收线程
+                        print(f"数据接受失败({connection.name}): {e}")
+                        connection.error = str(e)
+                        self.update_registration(connection)
+                        continue
+                    if waiting:
+                        self.service(connection)
+                for connection in polled_writes:
+                    self.flush(connection)
+        finally:
+            self.selector.close()
+            self.wake_reader.close()
+            self.wake_writer.close()
+
+
+class SerialAsyncioBackend:
+    # asyncio 后端: 一个后台线程运行事件循环, 端口 fd 设为非阻塞, 读写都由事件循环多路复用
+    # 只支持 POSIX; 接口与 SerialHelperThread 相同, 主线程的调用都通过 call_soon_threadsafe 转交给事件循环
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.connections = []
+        self.reading = set()
+        self.writing = set()
+        self.unfinished_writes = {}  # 只写出了一部分的数据块: 连接 -> (剩余数据, 入队时间)
+        self.poll_handle = None
+
+    def start(self):
+        self.thread.start()
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def call(self, callback, *args):
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def add_connection(self, connection):
+        self.call(self._add_connection, connection)
+
+    def remove_connection(self, connection, timeout=1.0):
+        done = threading.Event()
+        self.call(self._remove_connection, connection, done)
+        if self.is_alive() and threading.current_thread() is not self.thread:
+            done.wait(timeout)
+
+    def update_settings(self, connection, settings):
+        connection.settings = settings
+        self.call(self._apply_settings, connection, settings)
+
+    def set_parser(self, connection, parser):
+        self.call(setattr, connection, "receive_parser", parser)
+
+    def stop(self, timeout=1.0):
+        self.call(self.loop.stop)
+        if self.is_alive() and threading.current_thread() is not self.thread:
+            self.thread.join(timeout)
+
+    def write(self, connection, data, key=None):
+        # 发送队列满时按队列的策略丢弃, 起到背压作用
+        if not connection.write_queue.put(bytes(data), key):
+            return False
+        self.call(self._start_write, connection)
+        return True
+
+    # 以下方法只在事件循环线程中执行
+    def _add_connection(self, connection):
+        self.connections.append(connection)
+        fileno = connection.fileno()
+        if fileno is not None:
+            os.set_blocking(fileno, False)
+        self._update_reader(connection)
+
+    def _remove_connection(self, connection, done):
+        if connection in self.connections:
+            self.connections.remove(connection)
+        self._update_reader(connection)
+        if connection in self.writing:
+            self.loop.remove_writer(connection.fileno())
+            self.writing.discard(connection)
+        self.unfinished_writes.pop(connection, None)
+        connection.write_queue.close()
+        done.set()
+
+    def _apply_settings(self, connection, settings):
+        connection.apply_settings(settings)
+        self._update_reader(connection)
+
+    def _wants_reading(self, connection):
+        return connection in self.connections and not connection.receive_settings.stop_receiving and not connection.error
+
+    def _update_reader(self, connection):
+        fileno = connection.fileno()
+        if fileno is None:
+            if self._wants_reading(connection) and self.poll_handle is None:
+                self.poll_handle = self.loop.call_later(SERIAL_POLL_INTERVAL, self._poll)
+            return
+        if self._wants_reading(connection) and connection not in self.reading:
+            self.loop.add_reader(fileno, self._on_readable, connection)
+            self.reading.add(connection)
+        elif not self._wants_reading(connection) and connection in self.reading:
+            self.loop.remove_reader(fileno)
+            self.reading.discard(connection)
+
+    def _on_readable(self, connection):
+        if not service_serial_connection(connection):
+            self._update_reader(connection)
+
+    def _poll(self):
+        # 不支持 fileno 的端口定时检查 in_waiting
+        self.poll_handle = None
+        polled = [connection for connection in self.connections if connection.fileno() is None and self._wants_reading(connection)]
+        for connection in polled:
+            try:
+                waiting = connection.serial.in_waiting
+            except Exception as e:
+                connection.error = str(e)
+                continue
+            if waiting:
+                service_serial_connection(connection)
+        if polled:
+            self.poll_handle = self.loop.call_later(SERIAL_POLL_INTERVAL, self._poll)
+
+    def _start_write(self, connection):
+        if connection in self.connections and connection not in self.writing:
+            self._flush(connection)
+
+    def _flush(self, connection):
+        # 每次从队列取出合并后的一块数据写入, 内核缓冲区满时等 fd 可写后继续
+        fileno = connection.fileno()
+        write_queue = connection.write_queue
+        while True:
+            if connection in self.unfinished_writes:
+                data, queued_times = self.unfinished_writes.pop(connection)
+            else:
+                data, queued_times = write_queue.take()
+                if not data:
+                    break
+            try:
+                written = write_serial_connection(connection, data)
+            except OSError as e:
+                print(f"数据发送失败({connection.name}): {e}")
+                continue
+            if written < len(data):
+                self.unfinished_writes[connection] = (data[written:], queued_times)
+                if connection not in self.writing:
+                    self.loop.add_writer(fileno, self._flush, connection)
+                    self.writing.add(connection)
+                return
+            write_queue.record_write(queued_times, len(data))
+        if connection in self.writing:
+            self.loop.remove_writer(fileno)
+            self.writing.discard(connection)
+
+
+class SerialConnectionManager:
+    # 按名称管理多个同时打开的串口, 所有端口共用一个 I/O 后端(接收线程或 asyncio 事件循环)
+    def __init__(self):
+        self.connections = {}
+        self.io_backend = None
+
+    def create_io_backend(self, backend_type):
+        if backend_type == 'ASYNCIO':
+            if os.name == 'posix':
+                return SerialAsyncioBackend()
+            print("asyncio 后端只支持 Linux/macOS, 改用线程后端")
+        return SerialHelperThread()
+
+    def open(self, name, port, baudrate, bytesize, parity, stopbits, settings, backend_type='THREAD', send_queue_size=64 * 1024, send_queue_policy='DROP_OLD'):
+        if name in self.connections:
+            raise ValueError(f"连接 {name} 已经打开")
+        connection = SerialConnection(port, baudrate, bytesize, parity, stopbits, name=name, settings=settings)
+        connection.write_queue.configure(send_queue_size, send_queue_policy)
+        if serial_metrics.enabled:
+            connection.metrics = SerialConnectionMetrics()
+        self.connections[name] = connection
+        # 后端在第一个端口打开时创建, 切换后端需要先关闭所有端口
+        if self.io_backend is None or not self.io_backend.is_alive():
+            self.io_backend = self.create_io_backend(backend_type)
+            self.io_backend.start()
+        connection.io_backend = self.io_backend
+        self.io_backend.add_connection(connection)
+        return connection
+
+    def close(self, name):
+        connection = self.connections.pop(name, None)
+        if connection is None:
+            return False
+        self.io_backend.remove_connection(connection)
+        connection.io_backend = None
+        connection.close()
+        if not self.connections:
+            self.io_backend.stop()
+            self.io_backend = None
+        return True
+
+    def close_all(self):
+        for name in list(self.connections):
+            self.close(name)
+
+    def get(self, name=""):
+        # 名称为空时返回第一个打开的连接
+        if not name:
+            return next(iter(self.connections.values()), None)
+        return self.connections.get(name)
+
+
+def get_serial_connection_manager():
+    # 放在 driver_namespace 中, 重新加载插件后仍能找到已经打开的连接
+    if "serial_connections" not in bpy.app.driver_namespace:
+        bpy.app.driver_namespace["serial_connections"] = SerialConnectionManager()
+    return bpy.app.driver_namespace["serial_connections"]
+
+
+def sync_serial_data_list(scene):
+    # serial_data_list 只保存最新的 serial_data_max_count 行, 原地覆盖, 不随接收行数增长
+    # 返回显示内容是否发生了变化
+    if serial_log_buffer.synced_count == serial_log_buffer.count:
+        return False
+    serial_log_buffer.synced_count = serial_log_buffer.count
+    window = serial_log_buffer.window(scene.serial_helper.serial_data_max_count)
+    data_list = scene.serial_helper.serial_data_list
+    while len(data_list) > len(window):
+        data_list.remove(len(data_list) - 1)
+    while len(data_list) < len(window):
+        data_list.add()
+    for item, (index, connection_name, data) in zip(data_list, window):
+        if item.index != index:
+            item.index = index
+            item.connection_name = connection_name
+            item.data_string = data
+    return True
+
+
+class SerialPropertyBinding:
+    # 匹配项直接写入的目标属性: 数据路径只解析一次, 缓存属性所在的对象和属性名
+    # 只有数值和上次写入的不同时才写, 通过 RNA 赋值时 Blender 会自动标记依赖图更新
+    def __init__(self, id_block, data_path, index):
+        self.id_block = id_block
+        self.custom = data_path.endswith("]")
+        if self.custom:
+            # 自定义属性, 如 ["prop"] 或 pose.bones["Bone"]["prop"]
+            owner_path, _, key = data_path.rpartition("[")
+            self.attribute = ast.literal_eval(key[:-1])
+        else:
+            owner_path, _, self.attribute = data_path.rpartition(".")
+        self.owner = id_block.path_resolve(owner_path) if owner_path else id_block
+        current = self.owner[self.attribute] if self.custom else getattr(self.owner, self.attribute)
+        self.index = index
+        if index >= 0:
+            self.array = current  # bpy_prop_array, 与 owner 一样可以一直使用
+            current = current[index]
+        if type(current) not in (float, int, bool):
+            raise TypeError(f"不支持的属性类型 {type(current).__name__}")
+        # 整数属性四舍五入, 不直接截断
+        self.cast = (lambda value: int(round(value))) if type(current) is int else type(current)
+        self.last_value = current
+
+    def write(self, value):
+        # 返回是否写入了新值
+        value = self.cast(value)
+        if value == self.last_value:
+            return False
+        if self.index >= 0:
+            self.array[self.index] = value
+        elif self.custom:
+            self.owner[self.attribute] = value
+            self.id_block.update_tag()  # 自定义属性赋值不会自动标记更新
+        else:
+            setattr(self.owner, self.attribute, value)
+        self.last_value = value
+        return True
+
+
+# 匹配列表中每一项的 SerialPropertyBinding 或 None, 为 None 时在 serial_data_update 中重建
+serial_property_bindings = None
+
+
+def build_serial_property_bindings(scene):
+    bindings = []
+    for item in scene.serial_helper.serial_data_matching_list:
+        binding = None
+        id_block = resolve_target_id(item) if item.bind_target else None
+        if id_block is not None:
+            try:
+                binding = SerialPropertyBinding(id_block, item.target_data_path, item.target_index)
+            except (ValueError, TypeError, AttributeError, IndexError, KeyError, SyntaxError) as e:
+                print(f"匹配项{item.matching_data_name}的目标属性{item.target_data_path}解析失败: {e}")
+        bindings.append(binding)
+    return bindings
+
+
+def invalidate_serial_property_bindings(self=None, context=None):
+    # 用作目标相关属性的 update 回调, 匹配列表增删、撤销、打开文件后也要调用
+    global serial_property_bindings
+    serial_property_bindings = None
+
+
+def apply_matching_values(scene, slot_values):
+    # 返回匹配值是否发生了变化
+    global serial_property_bindings
+    changed = False
+    matching_list = scene.serial_helper.serial_data_matching_list
+    if serial_property_bindings is None:
+        serial_property_bindings = build_serial_property_bindings(scene)
+    bindings = serial_property_bindings
+    for slot, value in slot_values:
+        if slot >= len(matching_list):
+            continue  # 匹配列表变短后旧解析器还没替换时的数据
+        mapping_item = matching_list[slot]
+        # matching_data_value 是单精度浮点, 直接用 != 比较几乎总会判定为变化
+        if not math.isclose(value, mapping_item.matching_data_value, rel_tol=1e-6, abs_tol=1e-9):
+            mapping_item.matching_data_value = value
+            changed = True
+        binding = bindings[slot] if slot < len(bindings) else None
+        if binding is not None:
+            try:
+                binding.write(value)
+            except ReferenceError:
+                # 目标数据块已被删除
+                serial_property_bindings = None
+    return changed
+
+
+# 只重绘时需要刷新的区域类型
+SERIAL_REDRAW_AREA_TYPES = {'VIEW_3D', 'PROPERTIES', 'NODE_EDITOR', 'GRAPH_EDITOR'}
+
+
+class SceneRefreshScheduler:
+    # 合并刷新请求: 数据变化时只标记为脏,按设定频率最多刷新一次
+    def __init__(self):
+        self.values_dirty = False
+        self.log_dirty = False
+        self.last_refresh = 0.0
+
+    def mark_dirty(self, values_changed):
+        if values_changed:
+            self.values_dirty = True
+        self.log_dirty = True
+
+    def reset(self):
+        self.values_dirty = False
+        self.log_dirty = False
+        self.last_refresh = 0.0
+
+    def update(self, scene):
+        # 返回本次是否刷新了界面
+        if not (self.values_dirty or self.log_dirty):
+            return False
+        now = time.monotonic()
+        if now - self.last_refresh < 1.0 / scene.serial_helper.refresh_rate:
+            return False
+        self.last_refresh = now
+        if self.values_dirty and scene.serial_helper.refresh_mode == 'FRAME_SET':
+            scene.frame_set(scene.frame_current)  # 刷新界面
+        else:
+            # 匹配值没有变化时只重绘数据显示, 不触发依赖图更新
+            tag_redraw_areas(SERIAL_REDRAW_AREA_TYPES if self.values_dirty else {'VIEW_3D'})
+        self.values_dirty = False
+        self.log_dirty = False
+        return True
+
+
+def tag_redraw_areas(area_types):
+    wm = bpy.context.window_manager
+    if wm is None:
+        return
+    for window in wm.windows:
+        for area in window.screen.areas:
+            if area.type in area_types:
+                area.tag_redraw()
+
+
+scene_refresh_scheduler = SceneRefreshScheduler()
 
 
 def serial_data_update():
+    # 常驻定时器: 每次触发取出各连接各通道的最新值并同步显示窗口,批量处理后只刷新一次界面
+    manager = get_serial_connection_manager()
+    if not manager.connections:
+        return None  # 串口已全部关闭,停止定时器
     scene = bpy.context.scene
-    data = data_queue.get()
-    item = scene.serial_helper.serial_data_list.add()
-    item.index = scene.serial_helper.serial_data_count
-    item.data_string = data
-    for mapping_item in scene.serial_helper.serial_data_matching_list:
-        print(mapping_item.matching_data_value)
-        if extract_value(data, mapping_item.matching_data_name) != None:
-            mapping_item.matching_data_value = extract_value(data, mapping_item.matching_data_name)
-
-# 移除多余的项
-    if len(scene.serial_helper.serial_data_list) > scene.serial_helper.serial_data_max_count:
-        for i in range(len(scene.serial_helper.serial_data_list) - scene.serial_helper.serial_data_max_count):
-            scene.serial_helper.serial_data_list.remove(i)
-
-    scene.serial_helper.serial_data_count += 1
-    scene.frame_set(scene.frame_current)  # 刷新界面
-    # if bpy.context and bpy.context.screen:
-    #     for a in bpy.context.screen.areas:
-    #         a.tag_redraw()
-
-
-def open_serial_port():
-    scence = bpy.context.scene
-    if scence.serial_helper.use_input_serial_port:
-        port = scence.serial_helper.user_input_serial_port
+    interval = scene.serial_helper.serial_drain_interval
+    update_serial_data_parsers(scene, manager)  # 匹配列表变化后在这里重建并交给接收线程
+
+    start = time.perf_counter()
+    changed = False
+    samples = 0
+    for connection in manager.connections.values():
+        slot_values, connection_samples = connection.parser.latest_values.read_changed()
+        if apply_matching_values(scene, slot_values):
+            changed = True
+        samples += connection_samples
+    if samples:
+        receive_timing_stats.add_main(time.perf_counter() - start, samples)
+
+    log_changed = sync_serial_data_list(scene)
+
+    if samples or log_changed:
+        scene_refresh_scheduler.mark_dirty(changed)
+    if not serial_metrics.enabled:
+        scene_refresh_scheduler.update(scene)
+        return interval
+    drained = time.perf_counter()
+    serial_metrics.add_drain(drained - start)
+    if scene_refresh_scheduler.update(scene):
+        serial_metrics.add_refresh(time.perf_counter() - drained)
+    if serial_metrics.sample_due():
+        serial_metrics.sample(manager.connections.values())
+    return interval
+
+
+def update_serial_log_capacity(self, context):
+    serial_log_buffer.resize(max(self.serial_log_capacity, self.serial_data_max_count))
+
+
+def update_send_queue_settings(self, context):
+    connection = get_serial_connection_manager().get(self.name)
+    if connection is not None:
+        connection.write_queue.configure(self.send_queue_size * 1024, self.send_queue_policy)
+
+
+def update_serial_protocol(self, context):
+    invalidate_serial_data_parser()
+    update_serial_receive_settings(self, context)
+
+
+def update_serial_receive_settings(self, context):
+    # 编码、暂停等设置变化时把新的快照发给接收线程
+    # self 是 SerialConnectionItem 时只更新该连接, 否则(全局设置)更新所有连接
+    manager = get_serial_connection_manager()
+    connection_items = context.scene.serial_helper.serial_connections
+    for connection in manager.connections.values():
+        if isinstance(self, SerialConnectionItem) and self.name != connection.name:
+            continue
+        connection_item = connection_items.get(connection.name)
+        if connection_item is not None:
+            manager.io_backend.update_settings(connection, make_serial_receive_settings(context.scene, connection_item))
+
+
+def start_serial_data_update():
+    scene_refresh_scheduler.reset()
+    serial_log_buffer.resize(max(bpy.context.scene.serial_helper.serial_log_capacity, bpy.context.scene.serial_helper.serial_data_max_count))
+    receive_timing_stats.reset()
+    if not bpy.app.timers.is_registered(serial_data_update):
+        bpy.app.timers.register(serial_data_update, first_interval=0, persistent=True)
+
+
+def stop_serial_data_update():
+    if bpy.app.timers.is_registered(serial_data_update):
+        bpy.app.timers.unregister(serial_data_update)
+
+
+def make_serial_capture_path(scene, connection_item):
+    directory = scene.serial_helper.serial_capture_directory
+    if directory.startswith("//") and not bpy.data.is_saved:
+        # 文件还没有保存时相对路径会落到 Blender 的工作目录, 改为写入系统临时目录
+        # 不用 bpy.app.tempdir: 它在 Blender 退出时会被删除, 录制的数据就丢了
+        directory = os.path.join(tempfile.gettempdir(), directory[2:])
+    else:
+        directory = bpy.path.abspath(directory)
+    name = re.sub(r"[^\w\-]+", "_", connection_item.name)
+    return os.path.join(directory, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.shcap")
+
+
+def start_serial_capture(scene, connection_item, connection):
+    # 每次打开端口(包括自动重连)都新建一个录制文件
+    if connection.capture is not None:
+        return connection.capture
+    filepath = make_serial_capture_path(scene, connection_item)
+    try:
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        capture = SerialCaptureWriter(filepath, f"{connection.name} {connection.port} {connection.baudrate}", scene.serial_helper.serial_capture_compression)
+    except OSError as e:
+        print(f"无法开始录制原始数据({connection.name}): {e}")
+        connection.capture_error = str(e)
+        return None
+    capture.start()
+    connection.capture = capture
+    connection.capture_error = ""
+    print(f"开始录制原始数据: {filepath}")
+    return capture
+
+
+def stop_serial_capture(connection):
+    capture = connection.capture
+    if capture is None:
+        return
+    connection.capture = None
+    capture.stop()
+
+
+def update_serial_capture(self, context):
+    connection = get_serial_connection_manager().get(self.name)
+    if connection is None:
+        return
+    if self.capture_enabled:
+        start_serial_capture(context.scene, self, connection)
     else:
-        port = scence.serial_helper.serial_ports
-    baudrate = scence.serial_helper.baudrate
-    bytesize = scence.serial_helper.bytesize
-    parity = scence.serial_helper.parity
-    stopbits = scence.serial_helper.stopbits
-    if not "serial_connection" in bpy.app.driver_namespace:
-        bpy.app.driver_namespace["serial_connection"] = SerialConnection(port, baudrate, int(bytesize), parity, int(stopbits))
-        serial_thread = SerialHelperThread(bpy.app.driver_namespace["serial_connection"])
-        serial_thread.start()
-        bpy.app.driver_namespace["serial_thread"] = serial_thread
+        stop_serial_capture(connection)
+
+
+# 连接名称 -> 最近一次实际打开的端口, 自动重连时使用; 重连失败后连接对象已经关闭, 只能从这里找回
+serial_opened_ports = {}
+# 连接名称 -> 自动重连失败的原因, 显示在界面上
+serial_reconnect_errors = {}
+
+
+def open_serial_port(connection_item, port=None):
+    # port 为空时使用连接设置中的端口, 自动重连时传入之前实际打开的端口
+    scence = bpy.context.scene
+    if port is None:
+        port = get_connection_item_port(connection_item)
+    baudrate = connection_item.baudrate
+    bytesize = connection_item.bytesize
+    parity = connection_item.parity
+    stopbits = connection_item.stopbits
+    manager = get_serial_connection_manager()
+    if manager.get(connection_item.name) is None:
+        first_connection = not manager.connections
+        connection = manager.open(connection_item.name, port, baudrate, int(bytesize), parity, int(stopbits), make_serial_receive_settings(scence, connection_item), scence.serial_helper.serial_io_backend,
+                                  connection_item.send_queue_size * 1024, connection_item.send_queue_policy)
+        if connection_item.capture_enabled:
+            start_serial_capture(scence, connection_item, connection)
+        # 为新连接编译解析器
+        invalidate_serial_data_parser()
+        update_serial_data_parsers(scence, manager)
+        if first_connection:
+            start_serial_data_update()
+        serial_opened_ports[connection_item.name] = port
+        serial_reconnect_errors.pop(connection_item.name, None)
         print(f"成功打开串口{port}")
+        return connection
     else:
         print("串口已经打开")
 
 
+def close_serial_port(connection_item):
+    manager = get_serial_connection_manager()
+    serial_opened_ports.pop(connection_item.name, None)
+    serial_reconnect_errors.pop(connection_item.name, None)
+    if manager.close(connection_item.name):
+        if not manager.connections:
+            stop_serial_data_update()
+        print("成功关闭串口")
+    else:
+        print("无可关闭的串口")
+
+
 class SerialHelpPanel(bpy.types.Panel):
     bl_label = "Serial Helper"
     bl_idname = "VIEW3D_PT_serial_help"  # 通常与视图3D面板关联的ID
@@ -159,6 +2085,14 @@ class SerialHelpPanel(bpy.types.Panel):
 
         col = layout.column()
         col.operator("test.operator", text="Test Operator")
+        row0 = col.row()
+        row0.template_list("SERIAL_UL_ConnectionList", "", scene.serial_helper, "serial_connections", scene.serial_helper, "serial_connection_index", rows=2)
+        col0 = row0.column(align=True)
+        col0.operator("serial.add_connection_operator", icon='ADD', text="")
+        col0.operator("serial.remove_connection_operator", icon='REMOVE', text="")
+        connection_item = get_active_connection_item(scene)
+        if connection_item is None:
+            return
         row = col.row(align=True)
         row.scale_y = 2  # 调整按钮高度
         row.label(text="端口名：")
@@ -166,21 +2100,50 @@ class SerialHelpPanel(bpy.types.Panel):
         row1 = row.row()
         row1.scale_x = 2
         row1.alignment = 'EXPAND'
-        if scene.serial_helper.use_input_serial_port:
-            row1.prop(scene.serial_helper, "user_input_serial_port", text="")
+        if connection_item.use_input_serial_port:
+            row1.prop(connection_item, "user_input_serial_port", text="")
         else:
-            row1.prop(context.scene.serial_helper, "serial_ports", text="")
-        row1.prop(scene.serial_helper, "use_input_serial_port", text="", icon_value=197)
+            row1.prop(connection_item, "serial_ports", text="")
+        row1.prop(connection_item, "use_input_serial_port", text="", icon_value=197)
         row2 = col.row()
-        row2.alert = context.scene.serial_helper.serial_is_open  # 设置警告状态，使按钮变红
+        row2.alert = connection_item.serial_is_open  # 设置警告状态，使按钮变红
         row2.scale_y = 2  # 调整按钮高度
-        row2.operator("serial.switch_operator", text="打开串口" if context.scene.serial_helper.serial_is_open == False else "关闭串口")
+        row2.operator("serial.switch_operator", text="打开串口" if connection_item.serial_is_open == False else "关闭串口").index = scene.serial_helper.serial_connection_index
 
         box = col.box()
-        box.prop(context.scene.serial_helper, "baudrate")
-        box.prop(context.scene.serial_helper, "bytesize")
-        box.prop(context.scene.serial_helper, "stopbits")
-        box.prop(context.scene.serial_helper, "parity")
+        box.enabled = not connection_item.serial_is_open
+        box.prop(connection_item, "baudrate")
+        box.prop(connection_item, "bytesize")
+        box.prop(connection_item, "stopbits")
+        box.prop(connection_item, "parity")
+        col.prop(connection_item, "auto_reconnect")
+        if connection_item.serial_is_open and connection_item.name in serial_reconnect_errors:
+            row3 = col.row()
+            row3.alert = True
+            row3.label(text=f"重新连接失败: {serial_reconnect_errors[connection_item.name]}")
+
+
+def get_active_connection_item(scene):
+    connection_items = scene.serial_helper.serial_connections
+    index = scene.serial_helper.serial_connection_index
+    if 0 <= index < len(connection_items):
+        return connection_items[index]
+    return None
+
+
+class SERIAL_UL_ConnectionList(bpy.types.UIList):
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row(align=True)
+        row.alignment = 'EXPAND'
+        name_row = row.row()
+        name_row.enabled = not item.serial_is_open  # 打开后名称用于查找连接, 不允许修改
+        name_row.prop(item, "name", text="", emboss=False)
+        row.label(text=item.user_input_serial_port if item.use_input_serial_port else item.serial_ports)
+        if item.serial_is_open:
+            connection = get_serial_connection_manager().get(item.name)
+            if (connection is not None and connection.error) or item.name in serial_reconnect_errors:
+                row.label(text="", icon='ERROR')
+        row.operator("serial.switch_operator", text="", icon='LINKED' if item.serial_is_open else 'UNLINKED', emboss=False).index = index
 
 
 class ReceivingSettingsPanel(bpy.types.Panel):
@@ -202,11 +2165,144 @@ class ReceivingSettingsPanel(bpy.types.Panel):
     def draw(self, context):
         layout = self.layout
         box = layout.box()
-        row = box.row()
-        row.scale_y = 2
-        row.prop(context.scene.serial_helper, "Encoding")
-        col = row.column()
-        col.prop(context.scene.serial_helper, "StopReceiving", text="暂停" if context.scene.serial_helper.StopReceiving else "正在接收", icon_value=498 if context.scene.serial_helper.StopReceiving else 495)
+        connection_item = get_active_connection_item(context.scene)
+        if connection_item is not None:
+            box.label(text=f"连接: {connection_item.name}")
+            row = box.row()
+            row.scale_y = 2
+            row.prop(connection_item, "Encoding")
+            col = row.column()
+            col.prop(connection_item, "StopReceiving", text="暂停" if connection_item.StopReceiving else "正在接收", icon_value=498 if connection_item.StopReceiving else 495)
+            box.prop(connection_item, "serial_protocol", expand=True)
+            if connection_item.serial_protocol == 'TEXT':
+                row4 = box.row()
+                row4.prop(connection_item, "serial_delimiter")
+                if connection_item.serial_delimiter == 'CUSTOM':
+                    row4.alert = parse_custom_delimiter(connection_item.serial_custom_delimiter) is None
+                    row4.prop(connection_item, "serial_custom_delimiter", text="")
+        row5 = box.row()
+        row5.enabled = not get_serial_connection_manager().connections
+        row5.prop(context.scene.serial_helper, "serial_io_backend")
+        row2 = box.row()
+        row2.prop(context.scene.serial_helper, "serial_drain_interval")
+        row3 = box.row()
+        row3.prop(context.scene.serial_helper, "refresh_mode", text="")
+        row3.prop(context.scene.serial_helper, "refresh_rate")
+        manager = get_serial_connection_manager()
+        if manager.connections:
+            col2 = box.column()
+            col2.scale_y = 0.6
+            col2.label(text=f"接收线程: {receive_timing_stats.worker_us_per_sample():.1f} us/条")
+            col2.label(text=f"主线程: {receive_timing_stats.main_us_per_sample():.1f} us/条")
+            connection = manager.get(connection_item.name) if connection_item is not None else None
+            if connection is not None:
+                if connection.parser is not None:
+                    col2.label(text=f"覆盖丢弃: {connection.parser.latest_values.dropped}")
+                if connection.settings.binary:
+                    col2.label(text=f"校验失败: {connection.frame_errors} 帧")
+                if connection.error:
+                    col2.alert = True
+                    col2.label(text=f"读取失败: {connection.error}")
+
+
+class SerialMetricsPanel(bpy.types.Panel):
+    bl_label = "性能指标"
+    bl_idname = "VIEW_3D_PT_SerialMetrics"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_context = 'scene'
+    bl_options = {'DEFAULT_CLOSED'}
+
+    bl_parent_id = 'VIEW3D_PT_serial_help'
+    bl_ui_units_x = 0
+
+    def draw_header(self, context):
+        self.layout.prop(context.scene.serial_helper, "serial_metrics_enabled", text="")
+
+    def draw(self, context):
+        layout = self.layout
+        layout.enabled = context.scene.serial_helper.serial_metrics_enabled
+        rows = get_serial_metrics()
+        if not rows:
+            layout.label(text="开启后每秒更新一次")
+        for name, row in rows.items():
+            box = layout.box()
+            box.label(text=f"连接: {name}")
+            col = box.column()
+            col.scale_y = 0.6
+            col.label(text=f"接收: {row['bytes_in_per_sec']:.0f} 字节/秒  {row['lines_in_per_sec']:.0f} 行/秒")
+            col.label(text=f"发送: {row['bytes_out_per_sec']:.0f} 字节/秒  {row['packets_out_per_sec']:.0f} 包/秒")
+            col.label(text=f"发送队列: {row['queue_bytes']} 字节 {row['queue_packets']} 包  丢弃: {row['dropped_packets']} 包")
+            col.label(text=f"覆盖丢弃: {row['dropped_samples']} 个样本  校验失败: {row['frame_errors']} 帧")
+            col.label(text=f"解析: {row['parse_us_per_line']:.1f} us/行  写入延迟: {row['write_latency_ms']:.2f} ms")
+            col.label(text=f"接收线程 CPU: {row['reader_cpu_percent']:.1f}%")
+        if rows:
+            row = next(iter(rows.values()))
+            col2 = layout.column()
+            col2.scale_y = 0.6
+            col2.label(text=f"主线程取数: 平均 {row['drain_ms']:.3f} ms  最大 {row['drain_max_ms']:.3f} ms")
+            col2.label(text=f"场景刷新: 平均 {row['refresh_ms']:.3f} ms  最大 {row['refresh_max_ms']:.3f} ms")
+        row3 = layout.row()
+        row3.prop(context.scene.serial_helper, "serial_metrics_csv_path", text="")
+        row3.operator("serial.export_metrics_operator", text="导出 CSV", icon='EXPORT')
+
+
+class SerialCapturePanel(bpy.types.Panel):
+    bl_label = "原始数据录制"
+    bl_idname = "VIEW_3D_PT_SerialCapture"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_context = 'scene'
+    bl_options = {'DEFAULT_CLOSED'}
+
+    bl_parent_id = 'VIEW3D_PT_serial_help'
+    bl_ui_units_x = 0
+
+    def draw_header(self, context):
+        connection_item = get_active_connection_item(context.scene)
+        if connection_item is not None:
+            self.layout.prop(connection_item, "capture_enabled", text="")
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(context.scene.serial_helper, "serial_capture_directory", text="")
+        layout.prop(context.scene.serial_helper, "serial_capture_compression")
+        connection_item = get_active_connection_item(context.scene)
+        connection = get_serial_connection_manager().get(connection_item.name) if connection_item is not None else None
+        capture = connection.capture if connection is not None else None
+        if capture is None:
+            if connection is not None and connection.capture_error and connection_item.capture_enabled:
+                row = layout.row()
+                row.alert = True
+                row.label(text=f"无法开始录制: {connection.capture_error}")
+            return
+        col = layout.column()
+        col.scale_y = 0.6
+        col.label(text=f"文件: {os.path.basename(capture.filepath)}")
+        col.label(text=f"已写入: {capture.written_bytes / 1048576:.1f} MB 原始数据, 文件 {capture.file_size / 1048576:.1f} MB ({capture.codec})")
+        col.label(text=f"积压: {capture.captured_bytes - capture.written_bytes} 字节  丢弃: {capture.dropped_bytes} 字节")
+        if capture.error:
+            col.alert = True
+            col.label(text=f"写入失败: {capture.error}")
+
+
+class ExportSerialMetricsOperator(bpy.types.Operator):
+    bl_idname = "serial.export_metrics_operator"
+    bl_label = "导出性能指标"
+
+    def execute(self, context):
+        filepath = bpy.path.abspath(context.scene.serial_helper.serial_metrics_csv_path)
+        try:
+            count = export_serial_metrics_csv(filepath)
+        except OSError as e:
+            self.report({'ERROR'}, f"导出失败: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"已导出 {count} 行到 {filepath}")
+        return {'FINISHED'}
+
+
+def update_serial_metrics_enabled(self, context):
+    set_serial_metrics_enabled(self.serial_metrics_enabled)
 
 
 class SerialDataDisplayPanel(bpy.types.Panel):
@@ -228,10 +2324,13 @@ class SerialDataDisplayPanel(bpy.types.Panel):
         # row.operator("serial_data.delete_item", text="删除项")
         row.operator("serial_data.clear_items", text="清空数据", icon='TRASH')
         row.prop(scene.serial_helper, "serial_data_max_count", text="显示数量")
+        row.prop(scene.serial_helper, "serial_log_capacity")
+        row.prop(scene.serial_helper, "serial_log_enabled", text="", icon='TEXT')
 
 
 class SerialDataItemProperties(bpy.types.PropertyGroup):
     index: bpy.props.IntProperty(default=0)
+    connection_name: bpy.props.StringProperty()
     data_string: bpy.props.StringProperty()
 
 
@@ -241,15 +2340,60 @@ class SERIAL_UL_DataList(bpy.types.UIList):
         row = layout.row(align=True)
         row.alignment = 'LEFT'.upper()
         row.label(text=f"{item.index}")
+        if len(context.scene.serial_helper.serial_connections) > 1:
+            row.label(text=item.connection_name)
         row2 = row.row(align=True)
         row2.alignment = 'Expand'.upper()
         row2.scale_x = 1.5
         row2.prop(item, "data_string", text="")
 
 
+# 目标属性所属数据块的类型 -> bpy.data 中的集合名
+SERIAL_TARGET_ID_COLLECTIONS = {
+    'OBJECT': "objects",
+    'SCENE': "scenes",
+    'MATERIAL': "materials",
+    'SHAPE_KEY': "shape_keys",
+    'NODETREE': "node_groups",
+    'WORLD': "worlds",
+    'LIGHT': "lights",
+    'CAMERA': "cameras",
+    'ARMATURE': "armatures",
+    'MESH': "meshes",
+}
+
+
 class SerialDataMatchingProperties(bpy.types.PropertyGroup):
-    matching_data_name: bpy.props.StringProperty(name="匹配数据名称", default="匹配数据名称")
+    matching_data_name: bpy.props.StringProperty(name="匹配数据名称", default="匹配数据名称", update=invalidate_serial_data_parser)
     matching_data_value: bpy.props.FloatProperty(name="匹配值", default=0)
+    binary_channel: bpy.props.IntProperty(name="二进制通道", description="二进制协议中的通道号, -1 表示使用在列表中的位置", default=-1, min=-1, max=255, update=invalidate_serial_data_parser)
+    connection_name: bpy.props.StringProperty(name="连接", description="只匹配该连接收到的数据, 为空时匹配所有连接", default="", update=invalidate_serial_data_parser)
+    bind_target: bpy.props.BoolProperty(
+        name="直接写入目标",
+        description="收到数值后直接写入目标属性, 不需要驱动器",
+        default=False,
+        update=invalidate_serial_property_bindings
+    )
+    target_id_type: bpy.props.EnumProperty(
+        name="目标类型",
+        items=[
+            ('OBJECT', "物体", ""),
+            ('SCENE', "场景", ""),
+            ('MATERIAL', "材质", ""),
+            ('SHAPE_KEY', "形态键", ""),
+            ('NODETREE', "节点组", ""),
+            ('WORLD', "世界", ""),
+            ('LIGHT', "灯光", ""),
+            ('CAMERA', "相机", ""),
+            ('ARMATURE', "骨架", ""),
+            ('MESH', "网格", ""),
+        ],
+        default='OBJECT',
+        update=invalidate_serial_property_bindings
+    )
+    target_id_name: bpy.props.StringProperty(name="目标", description="直接写入或录制关键帧的数据块", default="", update=invalidate_serial_property_bindings)
+    target_data_path: bpy.props.StringProperty(name="数据路径", description="相对目标数据块的属性路径, 如 location", default="", update=invalidate_serial_property_bindings)
+    target_index: bpy.props.IntProperty(name="索引", description="数组属性的分量, 非数组属性为 -1", default=-1, min=-1, update=invalidate_serial_property_bindings)
 
 
 class SERIAL_UL_DataMatchingList(bpy.types.UIList):
@@ -258,6 +2402,12 @@ class SERIAL_UL_DataMatchingList(bpy.types.UIList):
         row.alignment = 'EXPAND'
         row.prop(item, "matching_data_name", text="数据名称")
         row.prop(item, "matching_data_value", text="匹配值")
+        connection_items = context.scene.serial_helper.serial_connections
+        if len(connection_items) > 1:
+            row.prop_search(item, "connection_name", context.scene.serial_helper, "serial_connections", text="")
+        connection_item = connection_items.get(item.connection_name) if item.connection_name else get_active_connection_item(context.scene)
+        if connection_item is not None and connection_item.serial_protocol == 'BINARY':
+            row.prop(item, "binary_channel", text="通道")
         row.operator("serial_data_matching.copy_driver", text="", icon='COPYDOWN', emboss=False).index = index
 
 
@@ -284,13 +2434,172 @@ class SerialHelperDataMatchingPanel(bpy.types.Panel):
         row2 = box.row()
         # row2.prop(scene.serial_helper, "serial_data_matching_update_use", text="更新数据用")
         # row2.operator("serial_data_matching.update_driver", icon_value=692, text="刷新更新数据驱动器")
+        index = scene.serial_helper.serial_data_matching_index
+        if 0 <= index < len(scene.serial_helper.serial_data_matching_list):
+            item = scene.serial_helper.serial_data_matching_list[index]
+            target_box = layout.box()
+            row3 = target_box.row()
+            row3.prop(item, "target_id_type", text="")
+            row3.prop_search(item, "target_id_name", bpy.data, SERIAL_TARGET_ID_COLLECTIONS[item.target_id_type], text="")
+            row4 = target_box.row()
+            row4.prop(item, "target_data_path", text="")
+            row4.prop(item, "target_index", text="索引")
+            target_box.prop(item, "bind_target")
+            if item.bind_target and serial_property_bindings is not None and index < len(serial_property_bindings) and serial_property_bindings[index] is None:
+                target_box.label(text="目标属性解析失败", icon='ERROR')
+        record_box = layout.box()
+        recording = serial_sample_recorder is not None
+        record_box.operator("serial_data_matching.record", text="停止录制并写入关键帧" if recording else "录制到关键帧", icon='PAUSE' if recording else 'REC')
+        row5 = record_box.row()
+        row5.prop(scene.serial_helper, "record_min_interval")
+        row5.prop(scene.serial_helper, "record_simplify_tolerance")
+        if recording:
+            record_box.label(text=f"已录制 {serial_sample_recorder.sample_count()} 个样本")
         col2 = box.column()
         col2.scale_y = 0.5
         col2.label(text="数据格式:  匹配数据名称=匹配值 如: x=100")
         col2.label(text="获取数据方式,右键,复制为新驱动器,然后在数值上右键,粘贴驱动器")
+        col2.label(text="或者设置目标并勾选直接写入目标, 不需要驱动器")
         col2.label(text="节点编辑器中驱动器不能刷新的话就复制上面那个驱动器到随便一个节点上")
 
 
+def decimate_samples(frames, values, min_interval):
+    # 相邻两个关键帧至少间隔 min_interval 帧, 最后一个样本总是保留
+    kept_frames = array.array('d')
+    kept_values = array.array('d')
+    last_frame = None
+    for i in range(len(frames)):
+        if last_frame is None or frames[i] - last_frame >= min_interval or i == len(frames) - 1:
+            kept_frames.append(frames[i])
+            kept_values.append(values[i])
+            last_frame = frames[i]
+    return kept_frames, kept_values
+
+
+def simplify_samples(frames, values, tolerance):
+    # Ramer-Douglas-Peucker: 去掉与首尾连线距离(数值方向)不超过 tolerance 的点, 用栈代替递归
+    count = len(frames)
+    if count < 3:
+        return frames, values
+    keep = bytearray(count)
+    keep[0] = keep[count - 1] = 1
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        frame0, value0 = frames[first], values[first]
+        slope = (values[last] - value0) / (frames[last] - frame0) if frames[last] != frame0 else 0.0
+        max_distance = -1.0
+        max_index = first
+        for i in range(first + 1, last):
+            distance = abs(values[i] - (value0 + slope * (frames[i] - frame0)))
+            if distance > max_distance:
+                max_distance = distance
+                max_index = i
+        if max_distance > tolerance:
+            keep[max_index] = 1
+            stack.append((first, max_index))
+            stack.append((max_index, last))
+    return (array.array('d', itertools.compress(frames, keep)),
+            array.array('d', itertools.compress(values, keep)))
+
+
+def resolve_target_id(item):
+    if not item.target_id_name or not item.target_data_path:
+        return None
+    return getattr(bpy.data, SERIAL_TARGET_ID_COLLECTIONS[item.target_id_type]).get(item.target_id_name)
+
+
+def get_action_fcurves(id_block):
+    animation_data = id_block.animation_data
+    action = animation_data.action
+    if hasattr(animation_data, "action_slot") and hasattr(action, "layers"):
+        # Blender 4.4 起动作分层, F 曲线在动作槽对应的 channelbag 中
+        from bpy_extras import anim_utils
+        channelbag = anim_utils.action_get_channelbag_for_slot(action, animation_data.action_slot)
+        if channelbag is not None:
+            return channelbag.fcurves
+    return action.fcurves
+
+
+def get_target_fcurve(item, frame):
+    # 先用 keyframe_insert 让 Blender 创建动作和 F 曲线, 再找到这条曲线
+    id_block = resolve_target_id(item)
+    if id_block is None:
+        return None
+    id_block.keyframe_insert(item.target_data_path, index=item.target_index, frame=frame)
+    return get_action_fcurves(id_block).find(item.target_data_path, index=max(item.target_index, 0))
+
+
+def insert_fcurve_samples(fcurve, frames, values):
+    # 录制的数据替换曲线上原有的关键帧, 用 add + foreach_set 一次写入
+    points = fcurve.keyframe_points
+    if hasattr(points, "clear"):
+        points.clear()
+    else:
+        while len(points):
+            points.remove(points[0], fast=True)
+    count = len(frames)
+    co = array.array('f', bytes(8 * count))
+    co[0::2] = array.array('f', frames)
+    co[1::2] = array.array('f', values)
+    points.add(count)
+    points.foreach_set("co", co)
+    try:
+        points.foreach_set("interpolation", array.array('i', [1]) * count)  # 1 = LINEAR
+    except (TypeError, AttributeError):
+        pass
+    fcurve.update()
+
+
+def bake_recorded_samples(scene, recorder):
+    # 返回 (写入的曲线数, 写入的关键帧数)
+    serial_helper = scene.serial_helper
+    fps = scene.render.fps / scene.render.fps_base
+    curves = 0
+    keys = 0
+    for slot, item in enumerate(serial_helper.serial_data_matching_list):
+        if slot >= len(recorder.counts) or not recorder.counts[slot]:
+            continue
+        seconds, values = recorder.samples(slot)
+        frames = array.array('d', (recorder.frame_start + second * fps for second in seconds))
+        if serial_helper.record_min_interval > 0:
+            frames, values = decimate_samples(frames, values, serial_helper.record_min_interval)
+        if serial_helper.record_simplify_tolerance > 0:
+            frames, values = simplify_samples(frames, values, serial_helper.record_simplify_tolerance)
+        try:
+            fcurve = get_target_fcurve(item, frames[0])
+        except (TypeError, RuntimeError) as e:
+            print(f"匹配项{item.matching_data_name}的目标属性无法插入关键帧: {e}")
+            continue
+        if fcurve is None:
+            continue
+        insert_fcurve_samples(fcurve, frames, values)
+        curves += 1
+        keys += len(frames)
+    return curves, keys
+
+
+class RecordSerialDataOperator(bpy.types.Operator):
+    bl_idname = "serial_data_matching.record"
+    bl_label = "录制接收数据"
+
+    def execute(self, context):
+        global serial_sample_recorder
+        scene = context.scene
+        if serial_sample_recorder is None:
+            serial_sample_recorder = SerialSampleRecorder(len(scene.serial_helper.serial_data_matching_list))
+            serial_sample_recorder.frame_start = scene.frame_current
+            return {'FINISHED'}
+        recorder = serial_sample_recorder
+        serial_sample_recorder = None
+        recorder.stop()
+        curves, keys = bake_recorded_samples(scene, recorder)
+        self.report({'INFO'}, f"录制了 {recorder.sample_count()} 个样本, 写入 {curves} 条曲线 {keys} 个关键帧")
+        return {'FINISHED'}
+
+
 class SendDataSerialPanel(bpy.types.Panel):
     bl_label = "发送数据"
     bl_idname = "VIEW_3D_PT_SendDataInSerialPanel"
@@ -305,6 +2614,8 @@ class SendDataSerialPanel(bpy.types.Panel):
         layout = self.layout
         scene = context.scene
         box = layout.box()
+        if len(scene.serial_helper.serial_connections) > 1:
+            box.prop_search(scene.serial_helper, "send_connection_name", scene.serial_helper, "serial_connections", text="发送到")
         row = box.row()
         row.scale_y = 2
         row.prop(scene.serial_helper, "serial_send_data", text="")
@@ -320,11 +2631,153 @@ class SendDataSerialPanel(bpy.types.Panel):
         row3 = box.row()
         row3.prop(scene.serial_helper, "is_auto_send", text="定时发送", icon_value=118)
         row3.prop(scene.serial_helper, "auto_send_interval", text="发送间隔(s)")
+        row5 = box.row()
+        row5.prop(scene.serial_helper, "is_stream_send", text="流式发送", icon='PLAY')
+        if scene.serial_helper.stream_sync_mode == 'FRAME':
+            row5.prop(scene.serial_helper, "stream_skip_frames")
+        else:
+            row5.prop(scene.serial_helper, "stream_send_rate", text="频率(Hz)")
+        box.row().prop(scene.serial_helper, "stream_sync_mode", expand=True)
+        box.row().prop(scene.serial_helper, "stream_source", expand=True)
+        if isinstance(serial_stream_sender, SerialFrameStreamer):
+            col4 = box.column()
+            col4.scale_y = 0.6
+            col4.label(text=f"已发送: {serial_stream_sender.sent} 包  跳过: {serial_stream_sender.skipped} 帧")
+        elif serial_stream_sender is not None:
+            col4 = box.column()
+            col4.scale_y = 0.6
+            col4.label(text=f"实际频率: {serial_stream_sender.achieved_rate():.1f} Hz  跳过: {serial_stream_sender.skipped} 次")
+            col4.label(text=f"抖动: 平均 {serial_stream_sender.average_jitter() * 1000:.3f} ms  最大 {serial_stream_sender.jitter_max * 1000:.3f} ms")
+        connection = get_serial_connection_manager().get(scene.serial_helper.send_connection_name)
+        if connection is not None:
+            connection_item = scene.serial_helper.serial_connections.get(connection.name)
+            if connection_item is not None:
+                row4 = box.row()
+                row4.prop(connection_item, "send_queue_size")
+                row4.prop(connection_item, "send_queue_policy", text="")
+                box.prop(connection_item, "send_periodic_overwrite")
+            write_queue = connection.write_queue
+            col3 = box.column()
+            col3.scale_y = 0.6
+            col3.label(text=f"排队: {write_queue.queued_bytes} 字节  丢弃: {write_queue.dropped} 条")
+            col3.label(text=f"写入延迟: 平均 {write_queue.average_write_latency() * 1000:.2f} ms  最大 {write_queue.write_latency_max * 1000:.2f} ms")
+
+
+SEND_TEMPLATE_PLACEHOLDER = re.compile(r"\{([^{}]*)\}")
+
+
+class SendVariableAccessor:
+    # 数据路径只编译一次, 每次发送直接执行编译好的代码对象
+    def __init__(self, variable_name, data_path):
+        self.variable_name = variable_name
+        self.data_path = data_path
+        try:
+            self.code = compile(data_path, "<send variable>", "eval")
+        except SyntaxError:
+            self.code = None
+
+    def get(self, scene):
+        if self.code is None:
+            raise ValueError("数据路径语法错误")
+        return eval(self.code, globals(), {'scene': scene})
+
+
+class SendTemplate:
+    # 发送模板预先拆分成文字段和变量段, 发送时按顺序取值后拼接一次
+    def __init__(self, template, variable_items):
+        accessors = {}
+        self.accessors = []  # 与变量列表顺序一致, 二进制协议按此顺序发送
+        for item in variable_items:
+            accessor = SendVariableAccessor(item.variable_name, item.data_path)
+            self.accessors.append(accessor)
+            # 变量名重复时与原来逐个 replace 一样, 以列表中第一个为准
+            accessors.setdefault(item.variable_name, accessor)
+        self.segments = []  # 字符串为文字段, SendVariableAccessor 为变量段
+        position = 0
+        for match in SEND_TEMPLATE_PLACEHOLDER.finditer(template):
+            accessor = accessors.get(match.group(1))
+            if accessor is None:
+                continue  # 不在变量列表中的 {xxx} 原样发送
+            if match.start() > position:
+                self.segments.append(template[position:match.start()])
+            self.segments.append(accessor)
+            position = match.end()
+        if position < len(template):
+            self.segments.append(template[position:])
+
+    def render(self, scene, on_error):
+        parts = []
+        failed = set()
+        for segment in self.segments:
+            if segment.__class__ is str:
+                parts.append(segment)
+                continue
+            try:
+                parts.append(str(segment.get(scene)))
+            except Exception:
+                # 取值失败时保留占位符, 同一个变量只报一次错
+                parts.append(f"{{{segment.variable_name}}}")
+                if segment not in failed:
+                    failed.add(segment)
+                    on_error(segment)
+        return "".join(parts)
+
+    def values(self, scene, on_error):
+        values = []
+        for accessor in self.accessors:
+            try:
+                values.append(float(accessor.get(scene)))
+            except Exception:
+                on_error(accessor)
+                values.append(0.0)
+        return values
+
+
+send_template_cache = None
+
+
+def get_send_template(scene):
+    global send_template_cache
+    if send_template_cache is None:
+        serial_helper = scene.serial_helper
+        send_template_cache = SendTemplate(serial_helper.serial_send_data, serial_helper.Send_variable_list)
+    return send_template_cache
+
+
+def invalidate_send_template(self=None, context=None):
+    # 用作发送文本、变量名、数据路径的 update 回调, 变量列表增删时也要调用
+    global send_template_cache
+    send_template_cache = None
+
+
+@bpy.app.handlers.persistent
+def serial_helper_load_post(*args):
+    # 打开新文件后场景换了, 缓存的发送模板和解析器都要重建, 没有写入的录制直接丢弃
+    # 旧版本保存的文件和新场景没有连接, 补上默认连接
+    global serial_sample_recorder
+    serial_sample_recorder = None
+    for scene in bpy.data.scenes:
+        ensure_default_connection(scene)
+    invalidate_serial_property_bindings()
+    invalidate_send_template()
+    invalidate_serial_data_parser()
+    invalidate_servo_channel_table()
+    stop_serial_stream()
+
+
+@bpy.app.handlers.persistent
+def serial_helper_undo_post(*args):
+    # 撤销后数据块可能被重新分配, 缓存的目标属性不能再用
+    # 撤销恢复匹配列表、发送内容、发送变量和舵机通道时不会触发 update 回调, 相应的缓存也要按恢复后的数据重建
+    invalidate_serial_property_bindings()
+    invalidate_serial_data_parser()
+    invalidate_send_template()
+    invalidate_servo_channel_table()
 
 
 class SendVariablePathItem(bpy.types.PropertyGroup):
-    variable_name: bpy.props.StringProperty(name="Variable Name", default="")
-    data_path: bpy.props.StringProperty(name="Data Path", default="")
+    variable_name: bpy.props.StringProperty(name="Variable Name", default="", update=invalidate_send_template)
+    data_path: bpy.props.StringProperty(name="Data Path", default="", update=invalidate_send_template)
 
 
 class SERIAL_UL_SendVariable_list(bpy.types.UIList):
@@ -378,6 +2831,142 @@ class SerialFastMessagePanle(bpy.types.Panel):
         col.operator("serial.remove_fast_message_operator", icon='REMOVE', text="")
 
 
+class SerialBakePanel(bpy.types.Panel):
+    bl_label = "离线烘焙"
+    bl_idname = "VIEW_3D_PT_SerialBakePanel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_context = "scene"
+
+    bl_parent_id = 'VIEW_3D_PT_SendDataInSerialPanel'
+
+    def draw(self, context):
+        layout = self.layout
+        scene = context.scene
+        layout.prop(scene.serial_helper, "serial_bake_filepath", text="")
+        layout.label(text=f"帧范围 {scene.frame_start} - {scene.frame_end}, 内容与流式发送相同")
+        layout.operator("serial.bake_stream_operator", text="烘焙", icon='RENDER_ANIMATION')
+        row = layout.row()
+        replaying = serial_replay_thread is not None and serial_replay_thread.is_alive()
+        row.operator("serial.replay_stream_operator", text="停止回放" if replaying else "回放", icon='PAUSE' if replaying else 'PLAY')
+        row.prop(scene.serial_helper, "serial_replay_loop")
+        if replaying:
+            packet_file = serial_replay_thread.packet_file
+            layout.label(text=f"回放: {serial_replay_thread.frame_index + 1}/{packet_file.frame_count} 帧  延迟: {serial_replay_thread.late} 帧")
+
+
+class SerialServoChannelPanel(bpy.types.Panel):
+    bl_label = "舵机通道"
+    bl_idname = "VIEW_3D_PT_ServoChannelPanel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_context = "scene"
+
+    bl_parent_id = 'VIEW_3D_PT_SendDataInSerialPanel'
+
+    def draw(self, context):
+        layout = self.layout
+        scene = context.scene
+        layout.prop(scene.serial_helper, "servo_armature", text="骨架")
+        row = layout.row()
+        row.template_list("SERIAL_UL_ServoChannel_list", "", scene.serial_helper, "servo_channels", scene.serial_helper, "servo_channel_index")
+        col = row.column(align=True)
+        col.operator("serial.add_servo_channel_operator", icon='ADD', text="")
+        col.operator("serial.remove_servo_channel_operator", icon='REMOVE', text="")
+        index = scene.serial_helper.servo_channel_index
+        if 0 <= index < len(scene.serial_helper.servo_channels):
+            item = scene.serial_helper.servo_channels[index]
+            box = layout.box()
+            armature = scene.serial_helper.servo_armature
+            if armature is not None and armature.pose is not None:
+                box.prop_search(item, "bone_name", armature.pose, "bones", text="骨骼")
+            else:
+                box.prop(item, "bone_name", text="骨骼")
+            row2 = box.row()
+            row2.prop(item, "rotation_axis", expand=True)
+            row2.prop(item, "invert")
+            row3 = box.row()
+            row3.prop(item, "scale")
+            row3.prop(item, "offset")
+            row4 = box.row()
+            row4.prop(item, "min_angle")
+            row4.prop(item, "max_angle")
+        layout.operator("serial.send_servo_data_operator", text="发送一次舵机数据", icon='FILE_TICK')
+
+
+class SerialServoChannelItem(bpy.types.PropertyGroup):
+    servo_id: bpy.props.IntProperty(name="舵机编号", default=1, min=0, max=255, update=invalidate_servo_channel_table)
+    bone_name: bpy.props.StringProperty(name="骨骼", description="骨骼的旋转模式需要是欧拉角", default="", update=invalidate_servo_channel_table)
+    rotation_axis: bpy.props.EnumProperty(
+        name="旋转轴",
+        items=[('X', "X", ""), ('Y', "Y", ""), ('Z', "Z", "")],
+        default='X',
+        update=invalidate_servo_channel_table
+    )
+    scale: bpy.props.FloatProperty(name="系数", description="旋转角度(度)乘以该系数", default=1, update=invalidate_servo_channel_table)
+    invert: bpy.props.BoolProperty(name="反向", default=False, update=invalidate_servo_channel_table)
+    offset: bpy.props.FloatProperty(name="偏移", description="乘以系数后加上的角度", default=90, update=invalidate_servo_channel_table)
+    min_angle: bpy.props.FloatProperty(name="最小", default=0, update=invalidate_servo_channel_table)
+    max_angle: bpy.props.FloatProperty(name="最大", default=180, update=invalidate_servo_channel_table)
+
+
+class SERIAL_UL_ServoChannel_list(bpy.types.UIList):
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row(align=True)
+        row.prop(item, "servo_id", text="", emboss=False)
+        row.label(text=f"{item.bone_name} {item.rotation_axis}")
+        if servo_channel_table is not None and index < len(servo_channel_table.angles) and len(servo_channel_table.ids) == len(data.servo_channels):
+            row.label(text=f"{servo_channel_table.angles[index]:.2f}")
+
+
+class AddSerialServoChannelOperator(bpy.types.Operator):
+    bl_idname = "serial.add_servo_channel_operator"
+    bl_label = "Add Servo Channel"
+
+    def execute(self, context):
+        channels = context.scene.serial_helper.servo_channels
+        item = channels.add()
+        item.servo_id = len(channels)
+        context.scene.serial_helper.servo_channel_index = len(channels) - 1
+        invalidate_servo_channel_table()
+        return {'FINISHED'}
+
+
+class RemoveSerialServoChannelOperator(bpy.types.Operator):
+    bl_idname = "serial.remove_servo_channel_operator"
+    bl_label = "Remove Servo Channel"
+
+    def execute(self, context):
+        channels = context.scene.serial_helper.servo_channels
+        index = context.scene.serial_helper.servo_channel_index
+        if not 0 <= index < len(channels):
+            return {'CANCELLED'}
+        channels.remove(index)
+        invalidate_servo_channel_table()
+        if index != 0:
+            context.scene.serial_helper.servo_channel_index = index - 1
+        return {'FINISHED'}
+
+
+class SendServoDataOperator(bpy.types.Operator):
+    bl_idname = "serial.send_servo_data_operator"
+    bl_label = "发送舵机数据"
+
+    def execute(self, context):
+        scene = context.scene
+        connection = get_serial_connection_manager().get(scene.serial_helper.send_connection_name)
+        if connection is None:
+            self.report({'ERROR'}, "串口未打开")
+            return {'CANCELLED'}
+        table = get_servo_channel_table(scene)
+        if table is None:
+            self.report({'ERROR'}, "未设置骨架")
+            return {'CANCELLED'}
+        if not ServoDataSender(connection, table).collect_and_send_servo_data(scene.serial_helper.servo_armature):
+            self.report({'WARNING'}, "发送缓冲区已满, 本次数据被丢弃")
+        return {'FINISHED'}
+
+
 class SerialFastMessageItem(bpy.types.PropertyGroup):
     message_name: bpy.props.StringProperty(name="名称", default="")
     message: bpy.props.StringProperty(name="消息", default="")
@@ -404,7 +2993,7 @@ class ClearSerialDataItemsOperator(bpy.types.Operator):
     def execute(self, context):
         scene = context.scene
         scene.serial_helper.serial_data_list.clear()
-        scene.serial_helper.serial_data_count = 1
+        serial_log_buffer.clear()
         return {'FINISHED'}
 
 
@@ -418,7 +3007,9 @@ class AddSerialDataMatchingItemOperator(bpy.types.Operator):
         item = scene.serial_helper.serial_data_matching_list.add()
         scene.serial_helper.serial_data_matching_index = len(scene.serial_helper.serial_data_matching_list) - 1
         item.matching_data_name = "数据名称"
-        item.matching__data_value = 0
+        item.matching_data_value = 0
+        invalidate_serial_data_parser()
+        invalidate_serial_property_bindings()
         return {'FINISHED'}
 
 
@@ -435,6 +3026,8 @@ class RemoveSerialDataMatchingItemOperator(bpy.types.Operator):
                 scene.serial_helper.serial_data_matching_index = scene.serial_helper.serial_data_matching_index-1
             else:
                 scene.serial_helper.serial_data_matching_index = 0
+            invalidate_serial_data_parser()
+            invalidate_serial_property_bindings()
         return {'FINISHED'}
 
 
@@ -468,36 +3061,56 @@ class UpdateSerialDriverDataMatchingOperator(bpy.types.Operator):
         return {'FINISHED'}
 
 
+def report_send_variable_error(self, accessor):
+    print(f"变量{accessor.variable_name}数据路径{accessor.data_path}获取失败")
+    self.report({'ERROR'}, f"变量{accessor.variable_name}数据路径{accessor.data_path}获取失败")
+
+
 def format_replace_var_string(self, input_string):
     scene = bpy.context.scene
-    eval_globals = {
-        'random': random,
-        'math': math,  # 示例：如果使用了 math 模块
-        # 可以添加更多你可能需要的模块
-    }
-    for item in scene.serial_helper.Send_variable_list:
-        try:
-            value = eval(item.data_path)  # 获取数据路径对应的值
-            input_string = input_string.replace(f"{{{item.variable_name}}}", str(value))
-        except:
-            print(f"变量{item.variable_name}数据路径{item.data_path}获取失败")
-            self.report({'ERROR'}, f"变量{item.variable_name}数据路径{item.data_path}获取失败")
-    return input_string
+    if input_string != scene.serial_helper.serial_send_data:
+        # 不是当前发送框里的文本(如快捷消息), 临时解析一次
+        template = SendTemplate(input_string, scene.serial_helper.Send_variable_list)
+    else:
+        template = get_send_template(scene)
+    return template.render(scene, lambda accessor: report_send_variable_error(self, accessor))
+
+
+def collect_send_variable_values(self):
+    # 二进制协议下按变量列表的顺序发送数值, 第 i 个变量对应通道 i
+    scene = bpy.context.scene
+    return get_send_template(scene).values(scene, lambda accessor: report_send_variable_error(self, accessor))
 
 
 class SendDataSerialOperator(bpy.types.Operator):
     bl_idname = "serial.send_data_operator"
     bl_label = "发送数据"
+    periodic: bpy.props.BoolProperty(default=False, options={'SKIP_SAVE'})
 
     def execute(self, context):
         scene = context.scene
-        SerialConnection = bpy.app.driver_namespace["serial_connection"]
+        SerialConnection = get_serial_connection_manager().get(scene.serial_helper.send_connection_name)
+        if SerialConnection is None:
+            self.report({'ERROR'}, "串口未打开")
+            return {'CANCELLED'}
+        connection_item = scene.serial_helper.serial_connections.get(SerialConnection.name)
+        # 定时发送的消息用固定的 key, 队列里还没发出的上一条会被覆盖
+        key = "periodic" if self.periodic and connection_item is not None and connection_item.send_periodic_overwrite else None
+        if SerialConnection.settings.binary:
+            try:
+                packet = pack_binary_channels(collect_send_variable_values(self))
+            except ValueError as e:
+                self.report({'ERROR'}, str(e))
+                return {'CANCELLED'}
+            SerialConnection.write(packet, key)
+            return {'FINISHED'}
         data_to_send = scene.serial_helper.serial_send_data
         var_replace_str = format_replace_var_string(self, data_to_send)
         print(var_replace_str)
         if scene.serial_helper.is_newline:
             var_replace_str = var_replace_str+"\r\n"
-        SerialConnection.serial.write(var_replace_str.encode(scene.serial_helper.Encoding))
+        if not SerialConnection.write(var_replace_str.encode(SerialConnection.settings.encoding), key):
+            self.report({'WARNING'}, "发送缓冲区已满, 本次数据被丢弃")
         return {'FINISHED'}
 
 
@@ -510,6 +3123,7 @@ class AddSerialHelperSendVariableOperator(bpy.types.Operator):
         item.variable_name = "var_name_" + str(len(context.scene.serial_helper.Send_variable_list))
         item.data_path = "data_path"
         context.scene.serial_helper.Send_variable_index = len(context.scene.serial_helper.Send_variable_list) - 1
+        invalidate_send_template()
         return {'FINISHED'}
 
 
@@ -521,6 +3135,7 @@ class RemoveSerialHelperSendVariableOperator(bpy.types.Operator):
         variable_list = context.scene.serial_helper.Send_variable_list
         index = context.scene.serial_helper.Send_variable_index
         variable_list.remove(index)
+        invalidate_send_template()
         if index != 0:
             context.scene.serial_helper.Send_variable_index = context.scene.serial_helper.Send_variable_index - 1
         return {'FINISHED'}
@@ -567,7 +3182,7 @@ class SendFastMessageOperator(bpy.types.Operator):
 def send_data_periodically():
     scene = bpy.context.scene
     if scene.serial_helper.is_auto_send:
-        bpy.ops.serial.send_data_operator()
+        bpy.ops.serial.send_data_operator(periodic=True)
         auto_send_interval = scene.serial_helper.auto_send_interval
         return auto_send_interval  # Repeat every second
     else:
@@ -583,12 +3198,356 @@ def update_sending_state(self, context):
         bpy.app.timers.unregister(send_data_periodically)
 
 
+class SerialStreamSender(threading.Thread):
+    # 流式发送: 主线程在场景更新/换帧时生成一份待发送的数据快照,
+    # 本线程按固定频率发送最新的快照, 不经过 bpy.ops 和 bpy.app.timers
+    # 发送时刻按 开始时间 + n * 周期 计算, 单次延迟不会累积成漂移
+    def __init__(self, connection_name, rate):
+        threading.Thread.__init__(self, daemon=True)
+        self.connection_name = connection_name
+        self.period = 1.0 / rate
+        self.snapshot = None  # 主线程整体替换, 不需要加锁
+        self.stop_event = threading.Event()
+        self.sent = 0
+        self.skipped = 0  # 落后超过一个周期时跳过的发送次数
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+        self.started_at = 0.0
+
+    def stop(self, timeout=1.0):
+        self.stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def achieved_rate(self):
+        elapsed = time.monotonic() - self.started_at
+        return self.sent / elapsed if self.sent and elapsed > 0 else 0.0
+
+    def average_jitter(self):
+        return self.jitter_total / self.sent if self.sent else 0.0
+
+    def run(self):
+        manager = get_serial_connection_manager()
+        self.started_at = next_time = time.monotonic()
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            if now < next_time:
+                self.stop_event.wait(next_time - now)
+                continue
+            jitter = now - next_time
+            if jitter >= self.period:
+                # 落后一个周期以上(如系统挂起), 丢掉错过的发送, 重新对齐到下一个时刻
+                missed = int(jitter / self.period)
+                self.skipped += missed
+                next_time += missed * self.period
+                jitter -= missed * self.period
+            next_time += self.period
+            snapshot = self.snapshot
+            connection = manager.get(self.connection_name)
+            if snapshot is None or connection is None:
+                continue
+            connection.write(snapshot, "stream")
+            self.sent += 1
+            self.jitter_total += jitter
+            self.jitter_max = max(self.jitter_max, jitter)
+
+    def update(self, scene, frame_changed):
+        connection = get_serial_connection_manager().get(self.connection_name)
+        if connection is not None:
+            self.snapshot = make_stream_snapshot(scene, connection.settings)
+
+
+class SerialFrameStreamer:
+    # 逐帧发送: 每个求值后的帧在主线程直接放入发送队列一包, 不等待定时器
+    # 没有换帧的场景更新(如暂停时拖动骨骼)只在数据有变化时发送, 不会重复发送旧数据
+    # skip_frames 为 True 时, 上一帧还没发出就被新的一帧覆盖, 链路跟不上时丢帧而不是积压
+    def __init__(self, connection_name, skip_frames):
+        self.connection_name = connection_name
+        self.skip_frames = skip_frames
+        self.last_frame = None
+        self.last_snapshot = None
+        self.sent = 0
+        self.skipped = 0
+
+    def stop(self, timeout=1.0):
+        pass
+
+    def update(self, scene, frame_changed):
+        connection = get_serial_connection_manager().get(self.connection_name)
+        if connection is None:
+            return
+        frame = scene.frame_current
+        if frame_changed and frame == self.last_frame:
+            frame_changed = False
+        snapshot = make_stream_snapshot(scene, connection.settings)
+        if snapshot is None or (not frame_changed and snapshot == self.last_snapshot):
+            return
+        dropped = connection.write_queue.dropped
+        connection.write(snapshot, "stream" if self.skip_frames else None)
+        self.skipped += connection.write_queue.dropped - dropped
+        self.sent += 1
+        self.last_frame = frame
+        self.last_snapshot = snapshot
+
+
+serial_stream_sender = None  # SerialStreamSender 或 SerialFrameStreamer
+
+
+def make_stream_snapshot(scene, settings):
+    # 必须在主线程调用: 读取发送变量或舵机角度, 按连接的协议和编码生成要发送的字节
+    if scene.serial_helper.stream_source == 'SERVOS':
+        table = get_servo_channel_table(scene)
+        if table is None:
+            return None
+        table.gather(scene.serial_helper.servo_armature)
+        return table.pack(settings.binary)
+    if settings.binary:
+        try:
+            return pack_binary_channels(get_send_template(scene).values(scene, report_stream_variable_error))
+        except ValueError as e:
+            # 在帧变化和依赖图更新的回调中调用, 不能抛出异常
+            print(f"流式发送失败: {e}")
+            return None
+    data = get_send_template(scene).render(scene, report_stream_variable_error)
+    if scene.serial_helper.is_newline:
+        data = data + "\r\n"
+    return data.encode(settings.encoding)
+
+
+def report_stream_variable_error(accessor):
+    print(f"变量{accessor.variable_name}数据路径{accessor.data_path}获取失败")
+
+
+@bpy.app.handlers.persistent
+def serial_stream_frame_change(scene, depsgraph=None):
+    if serial_stream_sender is not None:
+        serial_stream_sender.update(scene, True)
+
+
+@bpy.app.handlers.persistent
+def serial_stream_depsgraph_update(scene, depsgraph=None):
+    if serial_stream_sender is not None:
+        serial_stream_sender.update(scene, False)
+
+
+SERIAL_STREAM_HANDLERS = (
+    ("frame_change_post", serial_stream_frame_change),
+    ("depsgraph_update_post", serial_stream_depsgraph_update),
+)
+
+
+def start_serial_stream(scene):
+    global serial_stream_sender
+    stop_serial_stream()
+    serial_helper = scene.serial_helper
+    if serial_helper.stream_sync_mode == 'FRAME':
+        serial_stream_sender = SerialFrameStreamer(serial_helper.send_connection_name, serial_helper.stream_skip_frames)
+        serial_stream_sender.update(scene, True)
+    else:
+        serial_stream_sender = SerialStreamSender(serial_helper.send_connection_name, serial_helper.stream_send_rate)
+        serial_stream_sender.update(scene, True)
+        serial_stream_sender.start()
+    for handler_name, handler in SERIAL_STREAM_HANDLERS:
+        handlers = getattr(bpy.app.handlers, handler_name)
+        if handler not in handlers:
+            handlers.append(handler)
+
+
+def stop_serial_stream():
+    global serial_stream_sender
+    if serial_stream_sender is not None:
+        serial_stream_sender.stop()
+        serial_stream_sender = None
+    for handler_name, handler in SERIAL_STREAM_HANDLERS:
+        handlers = getattr(bpy.app.handlers, handler_name)
+        if handler in handlers:
+            handlers.remove(handler)
+
+
+def update_stream_sending(self, context):
+    # 也用作发送方式和跳帧选项的 update 回调: 正在发送时按新设置重新开始
+    if self.is_stream_send:
+        start_serial_stream(context.scene)
+    else:
+        stop_serial_stream()
+
+
+# 烘焙文件格式(小端):
+#   文件头: 标识 b"SHBK", 版本 u16, 保留 u16, 帧数 u32, 起始帧 i32, 帧率 f64
+#   索引: 帧数 + 1 个 u64, 第 i 帧的数据包是数据区 [索引[i], 索引[i + 1])
+#   数据区: 每帧要发送的字节依次拼接, 帧的数据包为空表示该帧不发送
+SERIAL_PACKET_FILE_MAGIC = b"SHBK"
+SERIAL_PACKET_FILE_VERSION = 1
+SERIAL_PACKET_FILE_HEADER = struct.Struct('<4sHHIid')
+
+
+def write_serial_packet_file(filepath, packets, fps, frame_start):
+    offsets = array.array('Q', [0])
+    for packet in packets:
+        offsets.append(offsets[-1] + len(packet))
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    with open(filepath, 'wb') as file:
+        file.write(SERIAL_PACKET_FILE_HEADER.pack(SERIAL_PACKET_FILE_MAGIC, SERIAL_PACKET_FILE_VERSION, 0, len(packets), frame_start, fps))
+        file.write(offsets.tobytes())
+        file.writelines(packets)
+
+
+class SerialPacketFile:
+    # 用 mmap 打开烘焙文件, 只读取用到的帧, 不把整个文件读入内存
+    def __init__(self, filepath):
+        with open(filepath, 'rb') as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.frame_count, self.frame_start, self.fps = SERIAL_PACKET_FILE_HEADER.unpack_from(self.mmap, 0)
+        if magic != SERIAL_PACKET_FILE_MAGIC or version != SERIAL_PACKET_FILE_VERSION:
+            self.mmap.close()
+            raise ValueError("不是串口助手的烘焙文件")
+        index_start = SERIAL_PACKET_FILE_HEADER.size
+        self.data_start = index_start + 8 * (self.frame_count + 1)
+        self.offsets = array.array('Q', self.mmap[index_start:self.data_start])
+        if sys.byteorder != 'little':
+            self.offsets.byteswap()
+
+    def packet(self, index):
+        return self.mmap[self.data_start + self.offsets[index]:self.data_start + self.offsets[index + 1]]
+
+    def close(self):
+        self.mmap.close()
+
+
+def bake_serial_stream(scene, filepath, settings, frame_start, frame_end):
+    # 逐帧求值一次, 保存每帧流式发送会发出的数据包, 可以在 blender -b 下运行
+    frame_current = scene.frame_current
+    packets = []
+    try:
+        for frame in range(frame_start, frame_end + 1):
+            scene.frame_set(frame)
+            packets.append(make_stream_snapshot(scene, settings) or b"")
+    finally:
+        scene.frame_set(frame_current)
+    write_serial_packet_file(filepath, packets, scene.render.fps / scene.render.fps_base, frame_start)
+    return len(packets)
+
+
+class SerialReplayThread(threading.Thread):
+    # 按烘焙时的帧率把文件中的数据包发到串口, 不需要求值场景
+    # 发送时刻按 开始时间 + 帧序号 / 帧率 计算, 线程其余时间都在等待
+    # 与流式发送不同, 回放不丢帧: 落后时立即补发, 并计入 late
+    def __init__(self, connection_name, packet_file, loop=False):
+        threading.Thread.__init__(self, daemon=True)
+        self.connection_name = connection_name
+        self.packet_file = packet_file
+        self.loop = loop
+        self.stop_event = threading.Event()
+        self.frame_index = 0
+        self.late = 0
+
+    def stop(self, timeout=1.0):
+        self.stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def run(self):
+        manager = get_serial_connection_manager()
+        packet_file = self.packet_file
+        period = 1.0 / packet_file.fps
+        try:
+            while not self.stop_event.is_set():
+                started_at = time.monotonic()
+                for index in range(packet_file.frame_count):
+                    self.frame_index = index
+                    delay = started_at + index * period - time.monotonic()
+                    if delay > 0:
+                        if self.stop_event.wait(delay):
+                            return
+                    elif delay < -period:
+                        self.late += 1
+                    packet = packet_file.packet(index)
+                    connection = manager.get(self.connection_name)
+                    if connection is None:
+                        return
+                    if packet:
+                        connection.write(packet)
+                if not self.loop:
+                    return
+        finally:
+            packet_file.close()
+
+
+serial_replay_thread = None
+
+
+def stop_serial_replay():
+    global serial_replay_thread
+    if serial_replay_thread is not None:
+        serial_replay_thread.stop()
+        serial_replay_thread = None
+
+
+def get_send_settings(scene):
+    # 发送所用连接的协议和编码; 连接没有打开时也可以用于烘焙
+    connection = get_serial_connection_manager().get(scene.serial_helper.send_connection_name)
+    if connection is not None:
+        return connection.settings
+    connection_items = scene.serial_helper.serial_connections
+    connection_item = connection_items.get(scene.serial_helper.send_connection_name) or (connection_items[0] if len(connection_items) else None)
+    if connection_item is None:
+        return SERIAL_DEFAULT_RECEIVE_SETTINGS
+    return make_serial_receive_settings(scene, connection_item)
+
+
+class BakeSerialStreamOperator(bpy.types.Operator):
+    bl_idname = "serial.bake_stream_operator"
+    bl_label = "烘焙发送数据"
+
+    filepath: bpy.props.StringProperty(default="", options={'SKIP_SAVE'})
+
+    def execute(self, context):
+        scene = context.scene
+        filepath = bpy.path.abspath(self.filepath or scene.serial_helper.serial_bake_filepath)
+        if not filepath:
+            self.report({'ERROR'}, "请先设置烘焙文件路径")
+            return {'CANCELLED'}
+        try:
+            frame_count = bake_serial_stream(scene, filepath, get_send_settings(scene), scene.frame_start, scene.frame_end)
+        except OSError as e:
+            self.report({'ERROR'}, f"烘焙文件写入失败: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"已烘焙 {frame_count} 帧到 {filepath}")
+        return {'FINISHED'}
+
+
+class ReplaySerialStreamOperator(bpy.types.Operator):
+    bl_idname = "serial.replay_stream_operator"
+    bl_label = "回放烘焙数据"
+
+    def execute(self, context):
+        global serial_replay_thread
+        if serial_replay_thread is not None and serial_replay_thread.is_alive():
+            stop_serial_replay()
+            return {'FINISHED'}
+        scene = context.scene
+        if get_serial_connection_manager().get(scene.serial_helper.send_connection_name) is None:
+            self.report({'ERROR'}, "串口未打开")
+            return {'CANCELLED'}
+        try:
+            packet_file = SerialPacketFile(bpy.path.abspath(scene.serial_helper.serial_bake_filepath))
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"烘焙文件打开失败: {e}")
+            return {'CANCELLED'}
+        serial_replay_thread = SerialReplayThread(scene.serial_helper.send_connection_name, packet_file, scene.serial_helper.serial_replay_loop)
+        serial_replay_thread.start()
+        return {'FINISHED'}
+
+
 class testOperator(bpy.types.Operator):
     bl_idname = "test.operator"
     bl_label = "Test Operator"
 
     def execute(self, context):
-        print(context.scene.serial_helper.bytesize)
+        connection_item = get_active_connection_item(context.scene)
+        if connection_item is not None:
+            print(connection_item.bytesize)
         return {'FINISHED'}
 
 
@@ -598,7 +3557,9 @@ class stopReceivingOperator(bpy.types.Operator):
     bl_options = {'REGISTER', 'UNDO'}  # 选项，注册到操作列表中，提供撤销功能
 
     def execute(self, context):
-        bpy.context.scene.serial_helper.StopReceiving = not bpy.context.scene.serial_helper.StopReceiving
+        connection_item = get_active_connection_item(context.scene)
+        if connection_item is not None:
+            connection_item.StopReceiving = not connection_item.StopReceiving
         return {'FINISHED'}
 
 
@@ -607,52 +3568,319 @@ class switchTheSerialPortOperator(bpy.types.Operator):
     bl_label = "打开串口"  # 操作符显示名称
     # bl_options = {'REGISTER', 'UNDO'}  # 选项，注册到操作列表中，提供撤销功能
 
+    index: bpy.props.IntProperty(default=-1)
+
     def execute(self, context):
         # 在这里执行按钮操作
-        context.scene.serial_helper.serial_is_open = not context.scene.serial_helper.serial_is_open
-        if context.scene.serial_helper.serial_is_open:
-
-            if bpy.context.scene.serial_helper.use_input_serial_port:
-                port = bpy.context.scene.serial_helper.user_input_serial_port
+        connection_items = context.scene.serial_helper.serial_connections
+        if not connection_items:
+            # 还没有连接时按单串口的用法自动创建一个
+            ensure_default_connection(context.scene)
+        index = self.index if self.index >= 0 else context.scene.serial_helper.serial_connection_index
+        if not 0 <= index < len(connection_items):
+            self.report({'ERROR'}, "请先添加串口连接")
+            return {'CANCELLED'}
+        connection_item = connection_items[index]
+        connection_item.serial_is_open = not connection_item.serial_is_open
+        if connection_item.serial_is_open:
+
+            if connection_item.use_input_serial_port:
+                port = connection_item.user_input_serial_port
             else:
-                port = bpy.context.scene.serial_helper.serial_ports
-            print(context.scene.serial_helper.serial_is_open)
+                port = connection_item.serial_ports
+            print(connection_item.serial_is_open)
             print(port)
-            print(context.scene.serial_helper.baudrate)
+            print(connection_item.baudrate)
+            # 连接名称是连接管理器中的键, 重名的连接无法同时打开
+            if sum(item.name == connection_item.name for item in connection_items) > 1:
+                connection_item.serial_is_open = False
+                self.report({'ERROR'}, f"连接名称 {connection_item.name} 重复, 请先改名")
+                return {'CANCELLED'}
             try:
-                open_serial_port()
+                if open_serial_port(connection_item) is None:
+                    raise RuntimeError(f"连接 {connection_item.name} 已经打开")
                 self.report(
                     {'INFO'}, f"串口打开{port}")
             except Exception as e:
                 print(f"An error occurred: {e}")
-                context.scene.serial_helper.serial_is_open = False
+                connection_item.serial_is_open = False
                 self.report(
                     {'ERROR'}, f"串口打开失败,{e}")
 
         else:
-            if "serial_connection" in bpy.app.driver_namespace:
-                serial_thread = bpy.app.driver_namespace["serial_thread"]
-                serial_thread.should_terminate = True
-                serial_SerialConnection = bpy.app.driver_namespace["serial_connection"]
-                serial_SerialConnection.serial.close()
-
-                del bpy.app.driver_namespace["serial_connection"]
-                del bpy.app.driver_namespace["serial_thread"]
-                print("成功关闭串口")
-            else:
-                print("无可关闭的串口")
+            close_serial_port(connection_item)
             self.report(
                 {'INFO'}, "串口关闭.")
 
         return {'FINISHED'}
 
 
+# 旧版本的枚举属性在文件中按位置保存
+SERIAL_LEGACY_CONNECTION_ENUMS = {
+    "bytesize": ['5', '6', '7', '8'],
+    "stopbits": ['1', '1.5', '2'],
+    "parity": ['N', 'E', 'O', 'M', 'S'],
+    "Encoding": ['utf-8', 'ascii', 'gbk', 'utf-16', 'gb2312'],
+}
+
+
+def ensure_default_connection(scene):
+    # 连接列表为空时新建一个连接, 保证单串口的用法打开插件就能用
+    # 旧版本只有一个串口, 设置直接保存在 serial_helper 上, 这些值仍在文件中, 复制到新建的连接
+    # serial_ports 保存的是当时列表中的位置, 现在已经对不上, 不复制
+    serial_helper = scene.serial_helper
+    if len(serial_helper.serial_connections):
+        return None
+    item = serial_helper.serial_connections.add()
+    item.name = "串口1"
+    for name in ("use_input_serial_port", "StopReceiving"):
+        value = serial_helper.get(name)
+        if value is not None:
+            setattr(item, name, bool(value))
+    for name in ("user_input_serial_port", "baudrate"):
+        value = serial_helper.get(name)
+        if value is not None:
+            setattr(item, name, value)
+    for name, values in SERIAL_LEGACY_CONNECTION_ENUMS.items():
+        value = serial_helper.get(name)
+        if value is not None and 0 <= value < len(values):
+            setattr(item, name, values[value])
+    serial_helper.serial_connection_index = 0
+    return item
+
+
+def ensure_default_connections():
+    # 启用插件时 register 中不能修改数据, 由一次性定时器为已有的场景补上默认连接
+    for scene in bpy.data.scenes:
+        ensure_default_connection(scene)
+    return None
+
+
+class AddSerialConnectionOperator(bpy.types.Operator):
+    bl_idname = "serial.add_connection_operator"
+    bl_label = "添加串口连接"
+
+    def execute(self, context):
+        connection_items = context.scene.serial_helper.serial_connections
+        # 删除过连接后按数量取名会重名, 取第一个没有用过的编号
+        number = len(connection_items) + 1
+        while connection_items.get(f"串口{number}") is not None:
+            number += 1
+        item = connection_items.add()
+        item.name = f"串口{number}"
+        context.scene.serial_helper.serial_connection_index = len(connection_items) - 1
+        return {'FINISHED'}
+
+
+class RemoveSerialConnectionOperator(bpy.types.Operator):
+    bl_idname = "serial.remove_connection_operator"
+    bl_label = "删除串口连接"
+
+    def execute(self, context):
+        connection_items = context.scene.serial_helper.serial_connections
+        index = context.scene.serial_helper.serial_connection_index
+        if not 0 <= index < len(connection_items):
+            return {'CANCELLED'}
+        if connection_items[index].serial_is_open:
+            close_serial_port(connection_items[index])
+        connection_items.remove(index)
+        if index != 0:
+            context.scene.serial_helper.serial_connection_index = index - 1
+        return {'FINISHED'}
+
+
+# inotify 事件: /dev 下设备节点的创建、删除和改名
+INOTIFY_DEVICE_EVENTS = 0x00000100 | 0x00000200 | 0x00000040 | 0x00000080
+# 设备节点出现后等待 udev 设置好权限再扫描(秒)
+SERIAL_PORT_SETTLE_TIME = 0.3
+# 没有 inotify 时检查 /dev 的间隔; 没有 /dev(Windows)时直接调用 comports 的间隔(秒)
+SERIAL_PORT_POLL_INTERVAL = 1.0
+SERIAL_PORT_SCAN_INTERVAL = 2.0
+
+
+def open_device_inotify():
+    # 返回监视 /dev 的 inotify fd, 不支持时返回 None
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, b"/dev", INOTIFY_DEVICE_EVENTS) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class SerialPortWatcher(threading.Thread):
+    # 在后台线程中枚举串口并缓存, 界面只读缓存, 不在每次重绘时扫描 sysfs
+    # Linux 上用 inotify 监视 /dev, 设备插拔时才重新扫描; 其他系统按间隔轮询
+    def __init__(self):
+        threading.Thread.__init__(self, daemon=True)
+        self.ports = ()  # (设备名, 描述), 整体替换; serial_ports 的 items 由主线程根据它生成
+        self.version = 0  # 端口列表每变化一次加一
+        self.stop_event = threading.Event()
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.scan()
+
+    def scan(self):
+        ports = tuple(sorted((port.device, port.description or "") for port in serial.tools.list_ports.comports()))
+        if ports != self.ports:
+            self.ports = ports
+            self.version += 1
+
+    def devices(self):
+        return {device for device, _ in self.ports}
+
+    def stop(self, timeout=1.0):
+        self.stop_event.set()
+        self.wake_writer.send(b"\0")
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+        self.wake_reader.close()
+        self.wake_writer.close()
+
+    def run(self):
+        inotify_fd = open_device_inotify()
+        try:
+            if inotify_fd is not None:
+                self.watch_inotify(inotify_fd)
+            elif os.path.isdir("/dev"):
+                self.watch_dev_listing()
+            else:
+                while not self.stop_event.wait(SERIAL_PORT_SCAN_INTERVAL):
+                    self.scan()
+        except Exception as e:
+            print(f"串口监视线程出错: {e}")
+        finally:
+            if inotify_fd is not None:
+                os.close(inotify_fd)
+
+    def drain(self, fd):
+        try:
+            while os.read(fd, 4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def watch_inotify(self, inotify_fd):
+        with selectors.DefaultSelector() as selector:
+            selector.register(inotify_fd, selectors.EVENT_READ)
+            selector.register(self.wake_reader, selectors.EVENT_READ)
+            while not self.stop_event.is_set():
+                selector.select()
+                if self.stop_event.is_set():
+                    return
+                self.drain(inotify_fd)
+                # 一次插拔会产生一串事件, 等设备稳定后只扫描一次
+                if self.stop_event.wait(SERIAL_PORT_SETTLE_TIME):
+                    return
+                self.drain(inotify_fd)
+                self.scan()
+
+    def watch_dev_listing(self):
+        # 列出 /dev 比枚举串口便宜得多, 只有设备节点变化时才重新扫描
+        listing = set(os.listdir("/dev"))
+        while not self.stop_event.wait(SERIAL_PORT_POLL_INTERVAL):
+            current = set(os.listdir("/dev"))
+            if current != listing:
+                listing = current
+                self.scan()
+
+
+serial_port_watcher = None
+
+
+def start_serial_port_watcher():
+    global serial_port_watcher, serial_port_seen_version
+    if serial_port_watcher is None:
+        serial_port_watcher = SerialPortWatcher()
+        serial_port_watcher.start()
+        serial_port_seen_version = -1  # 新线程的版本号重新计数
+    if not bpy.app.timers.is_registered(serial_port_watch_update):
+        bpy.app.timers.register(serial_port_watch_update, first_interval=SERIAL_PORT_POLL_INTERVAL, persistent=True)
+
+
+def stop_serial_port_watcher():
+    global serial_port_watcher
+    if bpy.app.timers.is_registered(serial_port_watch_update):
+        bpy.app.timers.unregister(serial_port_watch_update)
+    if serial_port_watcher is not None:
+        serial_port_watcher.stop()
+        serial_port_watcher = None
+
+
+serial_port_seen_version = -1
+# serial_ports 的 items: Blender 不会复制其中的字符串, 必须保持引用
+# 只在主线程中替换, 并保留上一份列表, 替换前已经开始绘制的界面仍可以安全使用
+serial_port_enum_items = []
+serial_port_previous_enum_items = []
+
+
+def update_serial_port_enum_items():
+    # 只在主线程调用, 返回端口列表是否变化
+    global serial_port_seen_version, serial_port_enum_items, serial_port_previous_enum_items
+    if serial_port_watcher.version == serial_port_seen_version:
+        return False
+    serial_port_seen_version = serial_port_watcher.version
+    serial_port_previous_enum_items = serial_port_enum_items
+    serial_port_enum_items = [(device, device, description) for device, description in serial_port_watcher.ports]
+    return True
+
+
+def serial_port_watch_update():
+    # 常驻定时器: 端口列表变化后刷新界面, 并重新连接设置了自动重连的端口
+    if serial_port_watcher is None:
+        return None
+    if update_serial_port_enum_items():
+        tag_redraw_areas({'VIEW_3D'})
+    reconnect_serial_ports(bpy.context.scene)
+    return SERIAL_PORT_POLL_INTERVAL
+
+
+def get_connection_item_port(connection_item):
+    return connection_item.user_input_serial_port if connection_item.use_input_serial_port else connection_item.serial_ports
+
+
+def reconnect_serial_ports(scene):
+    # 已打开但读取出错(如设备被拔出)的连接, 在设备重新出现后关闭旧端口并重新打开
+    manager = get_serial_connection_manager()
+    available = serial_port_watcher.devices()
+    for connection_item in scene.serial_helper.serial_connections:
+        if not (connection_item.auto_reconnect and connection_item.serial_is_open):
+            continue
+        connection = manager.connections.get(connection_item.name)
+        if connection is not None and not connection.error:
+            continue
+        # serial_ports 按位置保存, 插拔后可能指向别的设备, 优先重新打开之前实际打开的端口
+        port = serial_opened_ports.get(connection_item.name) or get_connection_item_port(connection_item)
+        if port not in available:
+            continue
+        if connection is not None:
+            manager.close(connection_item.name)
+        try:
+            open_serial_port(connection_item, port)
+            print(f"串口{port}已重新连接")
+        except Exception as e:
+            # 设备刚出现时权限可能还没设置好, 下次检查时用同一个端口再试
+            if serial_reconnect_errors.get(connection_item.name) != str(e):
+                print(f"串口{port}重新连接失败: {e}")
+            serial_reconnect_errors[connection_item.name] = str(e)
+
+
 def update_serial_ports(self, context):
-    ports = [port.device for port in serial.tools.list_ports.comports()]
-    return [(port, port, "") for port in ports]
+    # 只读取后台线程缓存的列表
+    if serial_port_watcher is None:
+        start_serial_port_watcher()
+    update_serial_port_enum_items()
+    return serial_port_enum_items
 
 
-class SerialHelperProperties(bpy.types.PropertyGroup):
+class SerialConnectionItem(bpy.types.PropertyGroup):
+    # 一个串口连接的设置, name 同时作为连接名称
     use_input_serial_port: bpy.props.BoolProperty(
         name="是否手动输入端口",
         description="是否手动输入端口",
@@ -663,9 +3891,20 @@ class SerialHelperProperties(bpy.types.PropertyGroup):
         description="串口端口",
         items=update_serial_ports,
     )
+    auto_reconnect: bpy.props.BoolProperty(
+        name="自动重连",
+        description="设备断开后重新出现时自动重新打开端口",
+        default=False
+    )
+    capture_enabled: bpy.props.BoolProperty(
+        name="录制原始数据",
+        description="端口打开期间把收到的原始字节连同时间戳一直写入录制文件",
+        default=False,
+        update=update_serial_capture
+    )
     user_input_serial_port: bpy.props.StringProperty(
         name="手动端口",
-        description="手动输入的端口",
+        description="手动输入的端口, 也可以是 socket://host:port、rfc2217://host:port、loop://、udp://本机地址:端口?remote=对方地址:端口 或 sim://?rate=1000&channels=x,y,z&format=text",
         default="COM3"
     )
 
@@ -728,35 +3967,235 @@ class SerialHelperProperties(bpy.types.PropertyGroup):
             ('utf-16', "utf-16", "utf-16"),
             ('gb2312', "gb2312", "gb2312"),
         ],
-        default='utf-8'
+        default='utf-8',
+        update=update_serial_receive_settings
     )
     StopReceiving: bpy.props.BoolProperty(
         name="StopReceiving",
         description="暂停接收",
-        default=False
+        default=False,
+        update=update_serial_receive_settings
+    )
+    send_queue_size: bpy.props.IntProperty(
+        name="发送队列(KB)",
+        description="发送队列最多积压的数据量",
+        default=64,
+        min=1,
+        update=update_send_queue_settings
+    )
+    send_queue_policy: bpy.props.EnumProperty(
+        name="队列满时",
+        description="发送队列满时的处理方式",
+        items=[
+            ('DROP_OLD', "丢弃最旧", "丢弃队列中最旧的数据, 保证最新的数据能发出"),
+            ('DROP_NEW', "丢弃新数据", "保留已经排队的数据, 丢弃新的数据"),
+        ],
+        default='DROP_OLD',
+        update=update_send_queue_settings
     )
+    send_periodic_overwrite: bpy.props.BoolProperty(
+        name="覆盖未发出的定时消息",
+        description="定时发送时, 上一条还没发出的消息直接被新消息替换",
+        default=True
+    )
+    serial_protocol: bpy.props.EnumProperty(
+        name="协议",
+        description="收发数据使用的协议",
+        items=[
+            ('TEXT', "文本", "名称=数值 形式的文本行"),
+            ('BINARY', "二进制", "COBS 分帧、CRC 校验的小端 float32 数据帧"),
+        ],
+        default='TEXT',
+        update=update_serial_protocol
+    )
+    serial_delimiter: bpy.props.EnumProperty(
+        name="分隔符",
+        description="接收数据的分帧方式",
+        items=[
+            ('LF', "\\n", "以换行符分隔"),
+            ('CRLF', "\\r\\n", "以回车换行分隔"),
+            ('CR', "\\r", "以回车符分隔"),
+            ('NUL', "\\0", "以空字符分隔"),
+            ('CUSTOM', "自定义", "使用自定义分隔符"),
+        ],
+        default='LF',
+        update=update_serial_receive_settings
+    )
+    serial_custom_delimiter: bpy.props.StringProperty(
+        name="自定义分隔符",
+        description="自定义分隔符, 支持 \\x03 这样的转义写法",
+        default="\\n",
+        update=update_serial_receive_settings
+    )
+
+
+class SerialHelperProperties(bpy.types.PropertyGroup):
+    serial_connections: bpy.props.CollectionProperty(type=SerialConnectionItem)
+    serial_connection_index: bpy.props.IntProperty()
     serial_data_list: bpy.props.CollectionProperty(type=SerialDataItemProperties)
     serial_data_index: bpy.props.IntProperty()
-    serial_data_count: bpy.props.IntProperty(default=1)
-    serial_data_max_count: bpy.props.IntProperty(default=5)
+    serial_data_max_count: bpy.props.IntProperty(default=5, min=1, update=update_serial_log_capacity)
+    serial_log_capacity: bpy.props.IntProperty(
+        name="缓冲行数",
+        description="接收数据环形缓冲区的容量, 超出后覆盖最旧的一行",
+        default=1000,
+        min=1,
+        update=update_serial_log_capacity
+    )
+    serial_log_enabled: bpy.props.BoolProperty(
+        name="显示接收数据",
+        description="把接收到的每一行放入显示队列, 关闭后只更新匹配值",
+        default=True,
+        update=update_serial_receive_settings
+    )
+    serial_io_backend: bpy.props.EnumProperty(
+        name="I/O 后端",
+        description="所有串口共用的读写方式, 在第一个串口打开时生效",
+        items=[
+            ('THREAD', "线程", "一个后台线程用 select 等待所有端口, 发送数据先进入每个端口的写队列, 由同一个线程非阻塞地写出"),
+            ('ASYNCIO', "asyncio", "后台 asyncio 事件循环, 读写都非阻塞, 每个端口有带背压的写队列(仅 Linux/macOS)"),
+        ],
+        default='THREAD'
+    )
+    serial_drain_interval: bpy.props.FloatProperty(
+        name="刷新间隔",
+        description="接收数据定时器的触发间隔(秒)",
+        default=1 / 60,
+        min=0.001,
+        max=1
+    )
+    refresh_mode: bpy.props.EnumProperty(
+        name="刷新方式",
+        description="匹配值变化后的界面刷新方式",
+        items=[
+            ('FRAME_SET', "刷新场景", "调用 frame_set 重新计算依赖图,驱动器会随之更新"),
+            ('REDRAW', "只重绘", "只重绘相关区域,不重新计算依赖图"),
+        ],
+        default='FRAME_SET'
+    )
+    refresh_rate: bpy.props.FloatProperty(
+        name="刷新频率",
+        description="每秒最多刷新场景的次数(Hz)",
+        default=30,
+        min=1,
+        max=240
+    )
     serial_data_matching_list: bpy.props.CollectionProperty(type=SerialDataMatchingProperties)
     serial_data_matching_index: bpy.props.IntProperty()
+    record_min_interval: bpy.props.FloatProperty(
+        name="最小间隔",
+        description="写入关键帧时相邻关键帧至少间隔的帧数, 0 表示保留所有样本",
+        default=0,
+        min=0
+    )
+    record_simplify_tolerance: bpy.props.FloatProperty(
+        name="简化容差",
+        description="写入关键帧前简化曲线, 去掉偏离不超过该值的点, 0 表示不简化",
+        default=0,
+        min=0
+    )
     serial_data_matching_update_use: bpy.props.FloatProperty(default=0)
-    serial_send_data: bpy.props.StringProperty(default="")
+    serial_send_data: bpy.props.StringProperty(default="", update=invalidate_send_template)
+    send_connection_name: bpy.props.StringProperty(name="发送到", description="发送数据使用的连接, 为空时使用第一个打开的连接", default="")
     is_newline: bpy.props.BoolProperty(default=True)
     Send_variable_list: bpy.props.CollectionProperty(type=SendVariablePathItem)
     Send_variable_index: bpy.props.IntProperty()
     is_auto_send: bpy.props.BoolProperty(default=False, update=update_sending_state)
     auto_send_interval: bpy.props.FloatProperty(default=1, min=0.01)
+    is_stream_send: bpy.props.BoolProperty(
+        name="流式发送",
+        description="在后台线程中按固定频率发送发送变量的最新值, 值在场景更新或换帧时刷新",
+        default=False,
+        options={'SKIP_SAVE'},
+        update=update_stream_sending
+    )
+    serial_metrics_enabled: bpy.props.BoolProperty(
+        name="性能指标",
+        description="统计各连接的收发速率、队列、丢弃、解析和刷新耗时",
+        default=False,
+        options={'SKIP_SAVE'},
+        update=update_serial_metrics_enabled
+    )
+    serial_metrics_csv_path: bpy.props.StringProperty(
+        name="指标文件",
+        description="性能指标导出的 CSV 文件",
+        default="//serial_metrics.csv",
+        subtype='FILE_PATH'
+    )
+    serial_capture_directory: bpy.props.StringProperty(
+        name="录制目录",
+        description="原始数据录制文件(.shcap 和 .idx)保存的目录",
+        default="//serial_capture/",
+        subtype='DIR_PATH'
+    )
+    serial_capture_compression: bpy.props.EnumProperty(
+        name="压缩",
+        description="录制文件数据块的压缩方式, 下次开始录制时生效",
+        items=[
+            ('AUTO', "自动", "优先使用 zstd, 其次 lz4, 都没有安装时使用 zlib"),
+            ('ZSTD', "zstd", "需要安装 zstandard"),
+            ('LZ4', "lz4", "需要安装 lz4"),
+            ('ZLIB', "zlib", "Python 自带, 压缩较慢"),
+            ('NONE', "不压缩", "不压缩"),
+        ],
+        default='AUTO'
+    )
+    serial_bake_filepath: bpy.props.StringProperty(
+        name="烘焙文件",
+        description="烘焙后每帧数据包保存的文件",
+        default="//serial_stream.shbk",
+        subtype='FILE_PATH'
+    )
+    serial_replay_loop: bpy.props.BoolProperty(name="循环", description="回放到结尾后从头开始", default=False)
+    stream_sync_mode: bpy.props.EnumProperty(
+        name="流式发送方式",
+        items=[
+            ('RATE', "固定频率", "后台线程按固定频率发送最新的数据"),
+            ('FRAME', "逐帧", "播放或拖动时间线时每一帧发送一包, 场景有变化时也发送"),
+        ],
+        default='RATE',
+        update=update_stream_sending
+    )
+    stream_skip_frames: bpy.props.BoolProperty(
+        name="允许跳帧",
+        description="上一帧还没发出时用新的一帧替换, 链路跟不上时丢帧而不是积压",
+        default=True,
+        update=update_stream_sending
+    )
+    stream_source: bpy.props.EnumProperty(
+        name="流式发送内容",
+        items=[
+            ('VARIABLES', "发送变量", "按发送文本和变量列表发送"),
+            ('SERVOS', "舵机通道", "按舵机通道表发送骨骼的旋转角度"),
+        ],
+        default='VARIABLES'
+    )
+    servo_armature: bpy.props.PointerProperty(
+        name="骨架",
+        type=bpy.types.Object,
+        poll=lambda self, obj: obj.type == 'ARMATURE',
+        update=invalidate_servo_channel_table
+    )
+    servo_channels: bpy.props.CollectionProperty(type=SerialServoChannelItem)
+    servo_channel_index: bpy.props.IntProperty()
+    stream_send_rate: bpy.props.FloatProperty(
+        name="流式发送频率",
+        description="流式发送每秒发送的次数(Hz), 修改后重新开启流式发送生效",
+        default=100,
+        min=1,
+        max=2000
+    )
     fast_message_list: bpy.props.CollectionProperty(type=SerialFastMessageItem)
     fast_message_index: bpy.props.IntProperty()
 
 
 property_Class = [
+    SerialConnectionItem,
     SerialDataItemProperties,
     SerialDataMatchingProperties,
     SendVariablePathItem,
     SerialFastMessageItem,
+    SerialServoChannelItem,
     SerialHelperProperties,
 
 
@@ -765,7 +4204,10 @@ property_Class = [
 
 Panel_Class = [
     SerialHelpPanel,
+    SERIAL_UL_ConnectionList,
     ReceivingSettingsPanel,
+    SerialMetricsPanel,
+    SerialCapturePanel,
     SerialDataDisplayPanel,
     SERIAL_UL_DataList,
     SerialHelperDataMatchingPanel,
@@ -775,23 +4217,35 @@ Panel_Class = [
     SERIAL_UL_FastMessage_list,
     SerialHelperSendVariablePanel,
     SerialFastMessagePanle,
+    SERIAL_UL_ServoChannel_list,
+    SerialServoChannelPanel,
+    SerialBakePanel,
 ]
 
 Operator_Class = [
     testOperator,
     switchTheSerialPortOperator,
+    AddSerialConnectionOperator,
+    RemoveSerialConnectionOperator,
     stopReceivingOperator,
     ClearSerialDataItemsOperator,
     AddSerialDataMatchingItemOperator,
     RemoveSerialDataMatchingItemOperator,
     CopyDriverSerialDataMatchingItemOperator,
     UpdateSerialDriverDataMatchingOperator,
+    RecordSerialDataOperator,
     SendDataSerialOperator,
     AddSerialHelperSendVariableOperator,
     RemoveSerialHelperSendVariableOperator,
     AddSerialFastMessageListOperator,
     RemoveSerialFastMessageListOperator,
-    SendFastMessageOperator
+    SendFastMessageOperator,
+    AddSerialServoChannelOperator,
+    RemoveSerialServoChannelOperator,
+    SendServoDataOperator,
+    BakeSerialStreamOperator,
+    ExportSerialMetricsOperator,
+    ReplaySerialStreamOperator
 ]
 
 
@@ -808,9 +4262,28 @@ def register():
 
     # 将 serial_helper 属性添加到 Scene 中
     bpy.types.Scene.serial_helper = bpy.props.PointerProperty(type=SerialHelperProperties)
+    bpy.app.handlers.load_post.append(serial_helper_load_post)
+    bpy.app.handlers.undo_post.append(serial_helper_undo_post)
+    bpy.app.handlers.redo_post.append(serial_helper_undo_post)
+    bpy.app.timers.register(ensure_default_connections, first_interval=0)
+    start_serial_port_watcher()
 
 
 def unregister():
+    global serial_sample_recorder
+    stop_serial_stream()
+    stop_serial_replay()
+    stop_serial_port_watcher()
+    if bpy.app.timers.is_registered(ensure_default_connections):
+        bpy.app.timers.unregister(ensure_default_connections)
+    serial_sample_recorder = None
+    get_serial_connection_manager().close_all()
+    stop_serial_data_update()
+    if serial_helper_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(serial_helper_load_post)
+    for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if serial_helper_undo_post in handlers:
+            handlers.remove(serial_helper_undo_post)
 
     for cls in property_Class:
         bpy.utils.unregister_class(cls)
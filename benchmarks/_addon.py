@@ -0,0 +1,120 @@
+# 在 Blender 之外加载插件模块, 供基准测试使用
+# 只提供运行插件数据处理代码所需的 bpy 替身, 不能代替真实的 Blender 环境:
+# 属性按声明的默认值生成普通的 Python 属性, 不会调用 update 回调, 也没有依赖图和界面
+import importlib.util
+import os
+import sys
+import types
+
+ADDON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "SerialHelper串口助手")
+
+PROPERTY_DEFAULTS = {
+    "BoolProperty": False,
+    "IntProperty": 0,
+    "FloatProperty": 0.0,
+    "StringProperty": "",
+}
+
+
+class StubProperty:
+    # bpy.props.XxxProperty(...) 的返回值, 记录属性类型和参数
+    def __init__(self, kind, kwargs):
+        self.kind = kind
+        self.kwargs = kwargs
+
+    def default_value(self):
+        if self.kind == "CollectionProperty":
+            return StubCollection(self.kwargs["type"])
+        if self.kind == "PointerProperty":
+            return new_property_group(self.kwargs["type"]) if hasattr(self.kwargs["type"], "__annotations__") else None
+        if self.kind == "EnumProperty":
+            items = self.kwargs["items"]
+            # items 为回调函数(动态枚举)时没有默认值
+            return self.kwargs.get("default", "" if callable(items) else items[0][0])
+        return self.kwargs.get("default", PROPERTY_DEFAULTS[self.kind])
+
+
+class StubCollection(list):
+    # CollectionProperty 的替身, 支持 add/remove/get
+    def __init__(self, item_type):
+        list.__init__(self)
+        self.item_type = item_type
+
+    def add(self):
+        item = new_property_group(self.item_type)
+        self.append(item)
+        return item
+
+    def remove(self, index):
+        del self[index]
+
+    def get(self, name, default=None):
+        for item in self:
+            if item.name == name:
+                return item
+        return default
+
+
+def new_property_group(cls):
+    # 按类中声明的属性生成一个实例, 属性值为声明的默认值
+    item = cls()
+    item.name = ""
+    for klass in reversed(cls.__mro__):
+        for name, prop in vars(klass).get("__annotations__", {}).items():
+            if isinstance(prop, StubProperty):
+                setattr(item, name, prop.default_value())
+    return item
+
+
+def make_scene(addon):
+    # 生成带 serial_helper 属性的场景, 并设为 bpy.context.scene
+    import bpy
+    scene = types.SimpleNamespace(
+        serial_helper=new_property_group(addon.SerialHelperProperties),
+        frame_current=1,
+        frame_start=1,
+        frame_end=250,
+        render=types.SimpleNamespace(fps=24, fps_base=1.0),
+    )
+    scene.frame_set = lambda frame: setattr(scene, "frame_current", frame)
+    bpy.context.scene = scene
+    return scene
+
+
+def _make_bpy_stub():
+    bpy = types.ModuleType("bpy")
+    bpy_types = types.ModuleType("bpy.types")
+    for name in ("Context", "Panel", "Operator", "UIList", "PropertyGroup", "Scene", "Object"):
+        setattr(bpy_types, name, type(name, (), {}))
+    bpy_props = types.ModuleType("bpy.props")
+    for name in ("BoolProperty", "IntProperty", "FloatProperty", "StringProperty",
+                 "EnumProperty", "PointerProperty", "CollectionProperty"):
+        setattr(bpy_props, name, lambda _kind=name, **kwargs: StubProperty(_kind, kwargs))
+    bpy.types = bpy_types
+    bpy.props = bpy_props
+    bpy.app = types.SimpleNamespace(
+        driver_namespace={},
+        timers=types.SimpleNamespace(register=lambda *a, **k: None, unregister=lambda *a: None, is_registered=lambda f: False),
+        handlers=types.SimpleNamespace(persistent=lambda f: f, load_post=[], undo_post=[], redo_post=[],
+                                       frame_change_post=[], depsgraph_update_post=[]),
+    )
+    bpy.utils = types.SimpleNamespace(register_class=lambda cls: None, unregister_class=lambda cls: None)
+    bpy.path = types.SimpleNamespace(abspath=lambda path: path)
+    bpy.context = types.SimpleNamespace(window_manager=None)
+    bpy.data = types.SimpleNamespace()
+    sys.modules["bpy.types"] = bpy_types
+    sys.modules["bpy.props"] = bpy_props
+    return bpy
+
+
+def load_addon():
+    if "serial_helper_addon" in sys.modules:
+        return sys.modules["serial_helper_addon"]
+    if "bpy" not in sys.modules:
+        sys.modules["bpy"] = _make_bpy_stub()
+    spec = importlib.util.spec_from_file_location(
+        "serial_helper_addon", os.path.join(ADDON_DIR, "__init__.py"), submodule_search_locations=[ADDON_DIR])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["serial_helper_addon"] = module
+    spec.loader.exec_module(module)
+    return module
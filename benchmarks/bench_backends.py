@@ -0,0 +1,82 @@
+# 比较线程后端与 asyncio 后端在 1/4/16 个端口下的接收延迟和 CPU 占用
+# 用 pty 模拟串口, 只能在 Linux/macOS 上运行; 需要安装 pyserial
+# 用法: python benchmarks/bench_backends.py [每个端口每秒行数] [持续秒数]
+import os
+import pty
+import statistics
+import sys
+import threading
+import time
+import tty
+
+from _addon import load_addon
+
+addon = load_addon()
+
+
+class LatencyRecorder:
+    # 代替 SerialLogBuffer, 在后端处理完一行时记录 写入->处理 的延迟
+    def __init__(self):
+        self.samples = []
+
+    def append(self, connection_name, data):
+        self.samples.append(time.perf_counter_ns() - int(data[2:]))
+
+
+def feed(masters, rate, duration):
+    period = 1.0 / rate
+    deadline = time.perf_counter()
+    end = deadline + duration
+    while deadline < end:
+        for master in masters:
+            os.write(master, f"t={time.perf_counter_ns()}\n".encode())
+        deadline += period
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def run(backend_type, port_count, rate, duration):
+    manager = addon.SerialConnectionManager()
+    recorder = LatencyRecorder()
+    pairs = [pty.openpty() for _ in range(port_count)]
+    for _, slave in pairs:
+        tty.setraw(slave)
+    for index, (_, slave) in enumerate(pairs):
+        connection = manager.open(f"port{index}", os.ttyname(slave), 115200, 8, 'N', 1,
+                                  addon.SERIAL_DEFAULT_RECEIVE_SETTINGS, backend_type)
+        connection.log_buffer = recorder
+    time.sleep(0.1)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    writer = threading.Thread(target=feed, args=([master for master, _ in pairs], rate, duration))
+    writer.start()
+    writer.join()
+    time.sleep(0.1)
+    cpu = (time.process_time() - cpu_start) / (time.perf_counter() - wall_start)
+    manager.close_all()
+    for master, slave in pairs:
+        os.close(master)
+        os.close(slave)
+    latencies = sorted(recorder.samples)
+    return {
+        "lines": len(latencies),
+        "p50_us": statistics.median(latencies) / 1000 if latencies else 0.0,
+        "p99_us": latencies[int(len(latencies) * 0.99) - 1] / 1000 if latencies else 0.0,
+        "cpu_percent": cpu * 100,
+    }
+
+
+def main():
+    rate = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    print(f"每个端口 {rate} 行/秒, 持续 {duration} 秒 (CPU 包含模拟设备的写入线程)")
+    print(f"{'后端':>8} {'端口数':>6} {'行数':>8} {'p50(us)':>10} {'p99(us)':>10} {'CPU%':>7}")
+    for port_count in (1, 4, 16):
+        for backend_type in ('THREAD', 'ASYNCIO'):
+            result = run(backend_type, port_count, rate, duration)
+            print(f"{backend_type:>8} {port_count:>6} {result['lines']:>8} {result['p50_us']:>10.1f} {result['p99_us']:>10.1f} {result['cpu_percent']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# 比较逐个名称调用 extract_value 与预编译的 SerialDataParser
+# 用法: python benchmarks/bench_parser.py
+import random
+import timeit
+
+from _addon import load_addon
+
+addon = load_addon()
+
+
+def make_line(names):
+    return ",".join(f"{name}={random.uniform(-1000, 1000):.3f}" for name in names)
+
+
+def old_update(line, names):
+    # 与原来的 serial_data_update 相同: 每个名称调用两次 extract_value
+    result = {}
+    for name in names:
+        if addon.extract_value(line, name) != None:
+            result[name] = addon.extract_value(line, name)
+    return result
+
+
+def new_update(line, names, parser):
+    values = parser.parse(line)
+    result = {}
+    for name in names:
+        value = values.get(name)
+        if value != None:
+            result[name] = value
+    return result
+
+
+def main():
+    print(f"{'通道数':>6} {'extract_value(us/行)':>22} {'SerialDataParser(us/行)':>24} {'加速比':>8}")
+    for count in (1, 10, 100):
+        names = [f"ch{i}" for i in range(count)]
+        line = make_line(names)
+        parser = addon.SerialDataParser(names)
+        assert old_update(line, names) == new_update(line, names, parser)
+        number = max(10, 20000 // count)
+        old = min(timeit.repeat(lambda: old_update(line, names), number=number, repeat=5)) / number
+        new = min(timeit.repeat(lambda: new_update(line, names, parser), number=number, repeat=5)) / number
+        print(f"{count:>6} {old * 1e6:>22.2f} {new * 1e6:>24.2f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
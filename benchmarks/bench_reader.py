@@ -0,0 +1,75 @@
+# 比较 readline() 逐字节读取与分块读取 + SerialLineFramer 的吞吐量
+# 用 pty 模拟串口, 只能在 Linux/macOS 上运行; 需要安装 pyserial
+# 用法: python benchmarks/bench_reader.py [总字节数]
+import os
+import pty
+import sys
+import threading
+import time
+import tty
+
+import serial
+
+from _addon import load_addon
+
+addon = load_addon()
+
+LINE = b"x=123.456,y=-78.9,z=0.001,w=42\n"
+
+
+def open_pty():
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    return master, slave, serial.Serial(os.ttyname(slave), 115200, timeout=1)
+
+
+def feed(master, total_lines):
+    data = LINE * 256
+    remaining = total_lines
+    while remaining > 0:
+        count = min(remaining, 256)
+        os.write(master, data[:count * len(LINE)])
+        remaining -= count
+
+
+def read_with_readline(serial_port, total_lines):
+    received = 0
+    while received < total_lines:
+        if serial_port.readline():
+            received += 1
+
+
+def read_with_framer(serial_port, total_lines):
+    framer = addon.SerialLineFramer(b"\n")
+    received = 0
+    while received < total_lines:
+        chunk = serial_port.read(min(serial_port.in_waiting, addon.SERIAL_READ_CHUNK_SIZE) or 1)
+        received += len(framer.feed(chunk))
+
+
+def run(reader, total_lines):
+    master, slave, serial_port = open_pty()
+    writer = threading.Thread(target=feed, args=(master, total_lines))
+    start = time.perf_counter()
+    writer.start()
+    reader(serial_port, total_lines)
+    elapsed = time.perf_counter() - start
+    writer.join()
+    serial_port.close()
+    os.close(master)
+    os.close(slave)
+    return total_lines * len(LINE) / elapsed
+
+
+def main():
+    total_bytes = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    total_lines = total_bytes // len(LINE)
+    before = run(read_with_readline, total_lines)
+    after = run(read_with_framer, total_lines)
+    print(f"readline():            {before / 1e6:8.2f} MB/s")
+    print(f"分块读取 + 分帧器:      {after / 1e6:8.2f} MB/s")
+    print(f"提升:                  {after / before:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
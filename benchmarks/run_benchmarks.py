@@ -0,0 +1,278 @@
+# 在 Blender 之外测量接收和发送流程的性能, 结果写成 JSON, 便于比较不同版本
+# 接收: 模拟设备按固定行率写入 pty(非 Linux/macOS 使用 loop://), 主线程像定时器一样循环调用 serial_data_update,
+#       测量收到的行数/秒, 以及从设备写入到 matching_data_value 更新的延迟
+# 解析: extract_value 与 SerialDataParser 每行的耗时
+# 发送: format_replace_var_string、pack_servo_data 和 ServoChannelTable 每秒能生成的数据包数
+# 用法: python benchmarks/run_benchmarks.py [--quick] [--duration 秒] [--output 结果.json] [--compare 旧结果.json]
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import timeit
+import types
+
+from _addon import load_addon, make_scene
+from bench_parser import make_line, new_update, old_update
+
+addon = load_addon()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def open_device(manager, backend_type):
+    # 返回 (连接, 写入函数, 清理函数)
+    if os.name == 'posix':
+        import pty
+        import tty
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        connection = manager.open("bench", os.ttyname(slave), 115200, 8, 'N', 1, addon.SERIAL_DEFAULT_RECEIVE_SETTINGS, backend_type)
+
+        def write(data):
+            view = memoryview(data)
+            while view:
+                view = view[os.write(master, view):]
+
+        def cleanup():
+            os.close(master)
+            os.close(slave)
+        return connection, write, cleanup
+    connection = manager.open("bench", "loop://", 115200, 8, 'N', 1, addon.SERIAL_DEFAULT_RECEIVE_SETTINGS, backend_type)
+    return connection, connection.serial.write, lambda: None
+
+
+def feed(write, channel_count, rate, duration, base_ns, done):
+    # 每毫秒把到期的行一次写出; 第一个通道 t 是写入时刻(相对 base_ns 的微秒数), 用于计算延迟
+    names = [f"ch{i}" for i in range(1, channel_count)]
+    tail = "".join(f" {name}={i * 1.5:.3f}" for i, name in enumerate(names))
+    started_at = time.perf_counter()
+    sent = 0
+    while True:
+        elapsed = time.perf_counter() - started_at
+        if elapsed >= duration:
+            break
+        due = int(elapsed * rate)
+        if due > sent:
+            stamp = (time.perf_counter_ns() - base_ns) // 1000
+            write("".join(f"t={stamp}{tail}\n" for _ in range(due - sent)).encode())
+            sent = due
+        time.sleep(0.001)
+    done.append(sent)
+
+
+def bench_receive(backend_type, channel_count, rate, duration):
+    scene = make_scene(addon)
+    serial_helper = scene.serial_helper
+    serial_helper.refresh_mode = 'REDRAW'
+    for name in ["t"] + [f"ch{i}" for i in range(1, channel_count)]:
+        serial_helper.serial_data_matching_list.add().matching_data_name = name
+    addon.invalidate_serial_data_parser()
+    addon.invalidate_serial_property_bindings()
+    addon.receive_timing_stats.reset()
+    manager = addon.get_serial_connection_manager()
+    connection, write, cleanup = open_device(manager, backend_type)
+    addon.update_serial_data_parsers(scene, manager)
+    time.sleep(0.05)
+
+    base_ns = time.perf_counter_ns()
+    done = []
+    writer = threading.Thread(target=feed, args=(write, channel_count, rate, duration, base_ns, done))
+    latencies = []
+    last_stamp = 0.0
+    interval = serial_helper.serial_drain_interval
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    writer.start()
+    settle_until = None
+    while settle_until is None or time.perf_counter() < settle_until:
+        addon.serial_data_update()
+        stamp = serial_helper.serial_data_matching_list[0].matching_data_value
+        if stamp != last_stamp:
+            latencies.append((time.perf_counter_ns() - base_ns) / 1000 - stamp)
+            last_stamp = stamp
+        if settle_until is None and not writer.is_alive():
+            settle_until = time.perf_counter() + 0.2
+        time.sleep(interval)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    received = connection.parser.latest_values.sequence[0]
+    manager.close_all()
+    cleanup()
+    return {
+        "backend": backend_type,
+        "channels": channel_count,
+        "rate": rate,
+        "drain_interval_ms": interval * 1000,
+        "lines_sent": done[0],
+        "lines_received": received,
+        "lines_per_sec": received / duration,
+        "latency_p50_us": statistics.median(latencies) if latencies else 0.0,
+        "latency_p99_us": percentile(latencies, 0.99),
+        "worker_us_per_sample": addon.receive_timing_stats.worker_us_per_sample(),
+        "main_us_per_sample": addon.receive_timing_stats.main_us_per_sample(),
+        "cpu_percent": cpu / wall * 100,
+    }
+
+
+def best_time(function, number):
+    return min(timeit.repeat(function, number=number, repeat=5)) / number
+
+
+def bench_parse(channel_count):
+    names = [f"ch{i}" for i in range(channel_count)]
+    line = make_line(names)
+    parser = addon.SerialDataParser(names)
+    number = max(10, 20000 // channel_count)
+    return {
+        "channels": channel_count,
+        "extract_value_us_per_line": best_time(lambda: old_update(line, names), number) * 1e6,
+        "parser_us_per_line": best_time(lambda: new_update(line, names, parser), number) * 1e6,
+    }
+
+
+def bench_send_template(variable_count):
+    scene = make_scene(addon)
+    serial_helper = scene.serial_helper
+    for i in range(variable_count):
+        item = serial_helper.Send_variable_list.add()
+        item.variable_name = f"v{i}"
+        item.data_path = f"scene.frame_current * {i + 1} + 0.5"
+    serial_helper.serial_send_data = ",".join(f"v{i}={{v{i}}}" for i in range(variable_count))
+    addon.invalidate_send_template()
+    operator = types.SimpleNamespace(report=lambda *args: None)
+    seconds = best_time(lambda: addon.format_replace_var_string(operator, serial_helper.serial_send_data), 2000)
+    return {"variables": variable_count, "sends_per_sec": 1 / seconds, "us_per_send": seconds * 1e6}
+
+
+class StubPoseBones(list):
+    # pose.bones 的替身; foreach_get 在 Python 中逐个复制, 比 Blender 中的实现慢得多
+    def find(self, name):
+        for index, bone in enumerate(self):
+            if bone.name == name:
+                return index
+        return -1
+
+    def foreach_get(self, attribute, buffer):
+        index = 0
+        for bone in self:
+            for value in getattr(bone, attribute):
+                buffer[index] = value
+                index += 1
+
+
+def bench_servo(servo_count):
+    bones = StubPoseBones(types.SimpleNamespace(name=f"bone{i}", rotation_euler=(0.01 * i, 0.2, -0.3)) for i in range(servo_count))
+    armature = types.SimpleNamespace(pose=types.SimpleNamespace(bones=bones))
+    items = [types.SimpleNamespace(servo_id=i, bone_name=f"bone{i}", rotation_axis='X', scale=1.0, invert=False,
+                                   offset=90.0, min_angle=0.0, max_angle=180.0) for i in range(servo_count)]
+    table = addon.ServoChannelTable(armature, items)
+    sender = addon.ServoDataSender(None, table)
+    servos = [(i, 90.0 + i) for i in range(servo_count)]
+    legacy = best_time(lambda: sender.pack_servo_data(servos).encode(), 2000)
+    text = best_time(lambda: (table.gather(armature), table.pack(False)), 2000)
+    binary = best_time(lambda: (table.gather(armature), table.pack(True)), 2000)
+    return {
+        "servos": servo_count,
+        "pack_servo_data_per_sec": 1 / legacy,
+        "table_text_per_sec": 1 / text,
+        "table_binary_per_sec": 1 / binary,
+    }
+
+
+def run(quick, duration):
+    backends = ['THREAD', 'ASYNCIO'] if os.name == 'posix' else ['THREAD']
+    channel_counts = (1, 10) if quick else (1, 10, 50)
+    rates = (100, 1000) if quick else (100, 1000, 10000)
+    results = {"parse": [], "receive": [], "send": [], "servo": []}
+    for channel_count in (1, 10, 100):
+        results["parse"].append(bench_parse(channel_count))
+    for backend_type in backends:
+        for channel_count in channel_counts:
+            for rate in rates:
+                results["receive"].append(bench_receive(backend_type, channel_count, rate, duration))
+    for variable_count in (1, 10, 50):
+        results["send"].append(bench_send_template(variable_count))
+    for servo_count in (8, 32, 64):
+        results["servo"].append(bench_servo(servo_count))
+    return {
+        "addon_version": ".".join(map(str, addon.bl_info["version"])),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "duration": duration,
+        "results": results,
+    }
+
+
+def print_results(report):
+    results = report["results"]
+    print(f"{'通道数':>6} {'extract_value(us/行)':>22} {'SerialDataParser(us/行)':>24}")
+    for row in results["parse"]:
+        print(f"{row['channels']:>6} {row['extract_value_us_per_line']:>22.2f} {row['parser_us_per_line']:>24.2f}")
+    print(f"\n{'后端':>8} {'通道数':>6} {'行率':>6} {'收到行/秒':>10} {'p50(us)':>10} {'p99(us)':>10} {'主线程(us/样本)':>16} {'CPU%':>6}")
+    for row in results["receive"]:
+        print(f"{row['backend']:>8} {row['channels']:>6} {row['rate']:>6} {row['lines_per_sec']:>10.0f} {row['latency_p50_us']:>10.0f} "
+              f"{row['latency_p99_us']:>10.0f} {row['main_us_per_sample']:>16.2f} {row['cpu_percent']:>6.1f}")
+    print(f"\n{'变量数':>6} {'format_replace_var_string(次/秒)':>34}")
+    for row in results["send"]:
+        print(f"{row['variables']:>6} {row['sends_per_sec']:>34.0f}")
+    print(f"\n{'舵机数':>6} {'pack_servo_data(次/秒)':>24} {'通道表文本(次/秒)':>18} {'通道表二进制(次/秒)':>20}")
+    for row in results["servo"]:
+        print(f"{row['servos']:>6} {row['pack_servo_data_per_sec']:>24.0f} {row['table_text_per_sec']:>18.0f} {row['table_binary_per_sec']:>20.0f}")
+
+
+# 比较时每个分组用来对齐两次结果的字段, 以及越大越好的指标
+COMPARE_KEYS = {
+    "parse": (("channels",), ()),
+    "receive": (("backend", "channels", "rate"), ("lines_per_sec",)),
+    "send": (("variables",), ("sends_per_sec",)),
+    "servo": (("servos",), ("pack_servo_data_per_sec", "table_text_per_sec", "table_binary_per_sec")),
+}
+
+
+def compare(old_report, new_report):
+    # 打印新结果相对旧结果的比值; 耗时和延迟类指标 < 1 表示变快, 次数类指标 > 1 表示变快
+    for group, (keys, higher_is_better) in COMPARE_KEYS.items():
+        old_rows = {tuple(row[key] for key in keys): row for row in old_report["results"].get(group, [])}
+        for row in new_report["results"][group]:
+            old_row = old_rows.get(tuple(row[key] for key in keys))
+            if old_row is None:
+                continue
+            ratios = []
+            for metric, value in row.items():
+                if metric in keys or not isinstance(value, (int, float)) or not old_row.get(metric):
+                    continue
+                if metric in higher_is_better or metric.endswith("_us") or metric.endswith("_per_line") or metric.endswith("_per_sample"):
+                    ratios.append(f"{metric}={value / old_row[metric]:.2f}")
+            print(f"{group} {dict(zip(keys, (row[key] for key in keys)))}: {' '.join(ratios)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="串口助手性能测试")
+    parser.add_argument("--quick", action="store_true", help="只测较少的通道数和行率组合")
+    parser.add_argument("--duration", type=float, default=1.0, help="每个接收测试持续的秒数")
+    parser.add_argument("--output", help="结果 JSON 的保存路径")
+    parser.add_argument("--compare", help="与之前保存的结果 JSON 比较")
+    args = parser.parse_args()
+    report = run(args.quick, args.duration)
+    print_results(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            print()
+            compare(json.load(file), report)
+
+
+if __name__ == "__main__":
+    sys.exit(main())